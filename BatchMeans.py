@@ -0,0 +1,227 @@
+#----------------------------------------------------------------------#
+# BatchMeans.py
+#
+# Confidence intervals from a single run by the method of batch means,
+# kept online in bounded memory. The run is cut into batches of equal
+# weight (simulated time for the number of jobs, jobs for the response
+# time). When there are 2 * numBatches batches, neighbouring batches are
+# merged and the batch size doubled, so there are always between
+# numBatches and 2 * numBatches of them covering the whole run.
+# WarmupBatches also finds the end of the warm-up period by MSER-5, so
+# estimates can leave out the start from an empty system.
+#
+#----------------------------------------------------------------------#
+
+from math import sqrt
+
+MAX_LAG1 = 0.2		# largest lag-1 correlation of the batch means the stopping rule accepts
+CHECK_INTERVAL = 50	# short batches completed between precision checks of a WarmupBatches
+
+# Two-sided Student t critical values by degrees of freedom 1..30, then 40, 60, 120 and infinity
+T_DEGREES = list(range(1, 31)) + [40, 60, 120]
+T_TABLE = {
+	0.90: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+		   1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725,
+		   1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697,
+		   1.684, 1.671, 1.658, 1.645],
+	0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+		   2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+		   2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+		   2.021, 2.000, 1.980, 1.960],
+	0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+		   3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845,
+		   2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750,
+		   2.704, 2.660, 2.617, 2.576],
+}
+
+
+# t critical value for a two-sided interval, interpolated in 1/degrees between table entries
+def tValue(degrees, confidence = 0.95):
+	if confidence not in T_TABLE:
+		raise ValueError("Confidence must be one of %s, got %s"%(", ".join(str(c) for c in sorted(T_TABLE)), confidence))
+	values = T_TABLE[confidence]
+	if degrees <= 30:
+		return values[degrees - 1]
+	for i in range(30, len(T_DEGREES)):
+		if degrees <= T_DEGREES[i]:
+			low, high = T_DEGREES[i - 1], T_DEGREES[i]
+			fraction = (1.0/low - 1.0/degrees) / (1.0/low - 1.0/high)
+			return values[i - 1] + fraction * (values[i] - values[i - 1])
+	fraction = 120.0/degrees
+	return values[-1] + fraction * (values[-2] - values[-1])
+
+
+#----------------------------------------------------------------------#
+# Class: BatchMeans
+#
+# add(value, weight) adds an observation: a value held for weight units
+# of time, or one job's value with weight 1. An interval that crosses a
+# batch boundary is split between the batches. With a precision set,
+# converged becomes True once the relative half-width of the interval
+# is at most precision, checked each time a batch is completed.
+#
+#----------------------------------------------------------------------#
+class BatchMeans(object):
+	def __init__(self, numBatches = 20, batchSize = 1.0):
+		self.numBatches = numBatches
+		self.batchSize = float(batchSize)	# weight of each batch, doubled as the run goes on
+		self.batches = []				# sums of value * weight of the completed batches
+		self.sum = 0.0					# of the batch being filled
+		self.weight = 0.0
+		self.totalSum = 0.0				# of the whole run
+		self.totalWeight = 0.0
+		self.precision = None
+		self.confidence = 0.95
+		self.converged = False
+
+	# Stop once the relative half-width at confidence is at most precision (None never stops)
+	def setPrecision(self, precision, confidence = 0.95):
+		tValue(1, confidence)		# check the confidence level up front
+		self.precision = precision
+		self.confidence = confidence
+		self.converged = False
+
+	def add(self, value, weight = 1.0):
+		self.totalSum += value * weight
+		self.totalWeight += weight
+
+		room = self.batchSize - self.weight
+		while weight >= room:
+			self.batches.append(self.sum + value * room)
+			weight -= room
+			self.sum = 0.0
+			self.weight = 0.0
+			if len(self.batches) == 2 * self.numBatches:
+				self.merge()
+			if self.precision is not None:
+				self.checkPrecision()
+			room = self.batchSize
+
+		self.sum += value * weight
+		self.weight += weight
+
+	# Merge neighbouring batches, halving their number
+	def merge(self):
+		batches = self.batches
+		self.batches = [batches[i] + batches[i + 1] for i in range(0, len(batches), 2)]
+		self.batchSize *= 2
+
+	def checkPrecision(self):
+		if len(self.batches) >= self.numBatches:
+			self.converged = self.precise(self.precision, self.confidence)
+
+	# Whether the half-width at confidence is at most precision times the mean. Batches all
+	# alike (e.g. an empty system so far) or still correlated say nothing about the precision.
+	def precise(self, precision, confidence = 0.95):
+		halfWidth = self.halfWidth(confidence)
+		return (halfWidth is not None and halfWidth > 0 and halfWidth <= precision * abs(self.mean()) and abs(self.lag1()) <= MAX_LAG1)
+
+	# Mean over the whole run, including the batch being filled
+	def mean(self):
+		if self.totalWeight <= 0:
+			return 0.0
+		return self.totalSum / self.totalWeight
+
+	def batchMeans(self):
+		return [batch / self.batchSize for batch in self.batches]
+
+	# Half-width of the confidence interval for the mean, None with fewer than 2 batches
+	def halfWidth(self, confidence = 0.95):
+		count = len(self.batches)
+		if count < 2:
+			return None
+		means = self.batchMeans()
+		grandMean = sum(means) / count
+		variance = sum((mean - grandMean)**2 for mean in means) / (count - 1)
+		return tValue(count - 1, confidence) * sqrt(variance / count)
+
+	# Lag-1 correlation of the batch means, near 0 once the batches are long enough to be independent
+	def lag1(self):
+		count = len(self.batches)
+		if count < 3:
+			return 0.0
+		means = self.batchMeans()
+		grandMean = sum(means) / count
+		deviations = [mean - grandMean for mean in means]
+		variance = sum(d * d for d in deviations)
+		if variance <= 0:
+			return 0.0
+		return sum(deviations[i] * deviations[i + 1] for i in range(count - 1)) / variance
+
+	# "mean +/- half-width" at confidence, for the console
+	def describe(self, confidence = 0.95):
+		halfWidth = self.halfWidth(confidence)
+		if halfWidth is None:
+			return "%.6f (too short for a confidence interval)"%self.mean()
+		return "%.6f +/- %.6f (%d%% CI, %d batches)"%(self.mean(), halfWidth, int(round(confidence * 100)), len(self.batches))
+
+
+#----------------------------------------------------------------------#
+# Class: WarmupBatches
+#
+# BatchMeans with many short batches (fineBatches to 2 * fineBatches),
+# fine enough to find where the warm-up period ends. MSER-5 groups the
+# short batches in fives and deletes the first d groups, d at most half
+# of them, that minimize the squared error of the mean of the rest
+# divided by their number squared. rebatch() merges the short batches
+# after a point into numBatches to 2 * numBatches batches for the
+# confidence interval. With truncate set, estimate() and the stopping
+# rule leave out the warm-up period.
+#
+#----------------------------------------------------------------------#
+class WarmupBatches(BatchMeans):
+	def __init__(self, numBatches = 20, fineBatches = 500, batchSize = 1.0, group = 5):
+		BatchMeans.__init__(self, fineBatches, batchSize)
+		self.estimateBatches = numBatches
+		self.group = group
+		self.truncate = False
+
+	# Weight (time or jobs) of the warm-up period found by MSER-5
+	def truncation(self):
+		group = self.group
+		count = len(self.batches) // group
+		if count < 2:
+			return 0.0
+		size = self.batchSize * group
+		means = [sum(self.batches[i * group:(i + 1) * group]) / size for i in range(count)]
+
+		# Sums over the groups from d on, built from the last group back
+		best = None
+		bestGroups = 0
+		total = 0.0
+		squares = 0.0
+		for d in range(count - 1, -1, -1):
+			total += means[d]
+			squares += means[d] * means[d]
+			if d <= count // 2:
+				left = count - d
+				mser = (squares - total * total / left) / (left * left)
+				if best is None or mser <= best:
+					best = mser
+					bestGroups = d
+		return bestGroups * size
+
+	# BatchMeans of the run after the first start units of weight
+	def rebatch(self, start = 0.0):
+		batches = BatchMeans(self.estimateBatches, self.batchSize)
+		for batch in self.batches[int(start // self.batchSize):]:
+			batches.add(batch / self.batchSize, self.batchSize)
+		if self.weight > 0:
+			batches.add(self.sum / self.weight, self.weight)
+		return batches
+
+	# BatchMeans of the run after the warm-up period
+	def steady(self):
+		return self.rebatch(self.truncation())
+
+	# BatchMeans the results are reported from
+	def estimate(self):
+		if self.truncate:
+			return self.steady()
+		return self.rebatch()
+
+	# Re-batching takes a pass over the short batches, so only check every CHECK_INTERVAL of them
+	def checkPrecision(self):
+		if len(self.batches) % CHECK_INTERVAL == 0:
+			estimate = self.estimate()
+			self.converged = len(estimate.batches) >= estimate.numBatches and estimate.precise(self.precision, self.confidence)
@@ -0,0 +1,65 @@
+#----------------------------------------------------------------------#
+# ConsoleBuffer.py
+#
+# Ring buffer of the last lines written to a GUI console. Writing a
+# line is an append to the buffer; the Tk Text widget is repainted from
+# it on a timer, and never holds more than the lines kept. The full
+# log is written to a file only when one is opened. Lines may be written
+# from a simulation's worker thread while the main thread repaints.
+#
+#----------------------------------------------------------------------#
+
+from collections import deque
+from itertools import islice
+import threading
+
+CONSOLE_LINES = 5000		# lines kept in the buffer and the console
+REFRESH_INTERVAL = 100		# ms between console repaints
+
+
+#----------------------------------------------------------------------#
+# Class: ConsoleBuffer
+#----------------------------------------------------------------------#
+class ConsoleBuffer(object):
+	def __init__(self, maxLines = CONSOLE_LINES):
+		self.maxLines = maxLines
+		self.lines = deque(maxlen = maxLines)
+		self.pending = 0				# lines written since the console was last repainted
+		self.logFile = None
+		self.lock = threading.Lock()
+
+	def write(self, text):
+		with self.lock:
+			self.lines.append(text)
+			self.pending += 1
+			if self.logFile is not None:
+				self.logFile.write('%s\n'%text)
+
+	# Lines written since the last call that are still kept, oldest first
+	def takePending(self):
+		with self.lock:
+			count = min(self.pending, len(self.lines))
+			self.pending = 0
+			return list(islice(self.lines, len(self.lines) - count, None))
+
+	def clear(self):
+		with self.lock:
+			self.lines.clear()
+			self.pending = 0
+
+	# Copy every line from now on to path, as well as the buffer
+	def openLog(self, path):
+		self.closeLog()
+		with self.lock:
+			self.logFile = open(path, 'w')
+
+	def flushLog(self):
+		with self.lock:
+			if self.logFile is not None:
+				self.logFile.flush()
+
+	def closeLog(self):
+		with self.lock:
+			if self.logFile is not None:
+				self.logFile.close()
+				self.logFile = None
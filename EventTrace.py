@@ -0,0 +1,67 @@
+#----------------------------------------------------------------------#
+# EventTrace.py
+#
+# Leveled tracing of the events of a run. A trace record is a tuple
+# (kind, time, fields...), and each script has a table of the console
+# line format of every kind. Call sites check the level before building
+# a record, so with tracing off a run neither builds nor formats any:
+#
+#	if self.Trace.level >= TRACE_EVENT:
+#		self.trace(('arrival', self.CurrentTime, J.name, J.ERPT))
+#
+#	off		nothing
+#	summary	once per run, e.g. the end of the run
+#	event	also every arrival and completion
+#	debug	also every preemption, requeue and start of service
+#
+#----------------------------------------------------------------------#
+
+from collections import deque
+
+TRACE_OFF = 0
+TRACE_SUMMARY = 1
+TRACE_EVENT = 2
+TRACE_DEBUG = 3
+TRACE_LEVELS = ['off', 'summary', 'event', 'debug']		# names of the levels, by number
+
+
+# Level from its name or number
+def parseTraceLevel(level):
+	if level in TRACE_LEVELS:
+		return TRACE_LEVELS.index(level)
+	if level in range(len(TRACE_LEVELS)):
+		return level
+	raise ValueError("Trace level must be one of %s, got %s"%(", ".join(TRACE_LEVELS), level))
+
+
+#----------------------------------------------------------------------#
+# Class: EventTrace
+#
+# Level and line formats of the trace of one run. With keep > 0 the
+# last keep records are also kept as tuples in records, e.g. to follow
+# every preemption of a debug run without parsing the console. output
+# says whether the console lines are read by anyone: a record is only
+# formatted into a line when they are.
+#
+#----------------------------------------------------------------------#
+class EventTrace(object):
+	def __init__(self, formats, level = TRACE_DEBUG, keep = 0, output = True):
+		self.formats = formats
+		self.level = parseTraceLevel(level)
+		self.records = deque(maxlen = keep) if keep else None
+		self.output = output
+
+	# Keep the record if asked to
+	def record(self, record):
+		if self.records is not None:
+			self.records.append(record)
+
+	# Console line of a record
+	def format(self, record):
+		return self.formats[record[0]] % record[1:]
+
+	# Kept records of the given kinds, oldest first
+	def find(self, *kinds):
+		if self.records is None:
+			return []
+		return [record for record in self.records if record[0] in kinds]
@@ -0,0 +1,81 @@
+#----------------------------------------------------------------------#
+# Headless.py
+#
+# Helpers for running the simulations without the Tk GUI, so they can
+# be driven from the command line or imported on display-less compute
+# nodes. Each simulation script exposes a runHeadless() function that
+# uses these.
+#
+#----------------------------------------------------------------------#
+
+import argparse
+
+from EventTrace import TRACE_LEVELS
+
+
+#----------------------------------------------------------------------#
+# Class: HeadlessConsole
+#
+# Stands in for the GUI as the "master" of MachineClass. Console output
+# is dropped, or written to a log file if one is given.
+#
+#----------------------------------------------------------------------#
+class HeadlessConsole(object):
+	def __init__(self, logFile = None):
+		self.logFile = None
+		if logFile:
+			self.logFile = open(logFile, "w")
+
+	def writeToConsole(self, text = ' '):
+		if self.logFile is not None:
+			self.logFile.write('%s\n'%text)
+
+	def updateStatusBar(self, text = ' '):
+		pass
+
+	def close(self):
+		if self.logFile is not None:
+			self.logFile.close()
+			self.logFile = None
+
+
+#----------------------------------------------------------------------#
+# Parse command line arguments for a headless run. Defaults match the
+# GUI defaults of the calling script.
+#----------------------------------------------------------------------#
+def parseArgs(description, load = 0.70, alpha = 1.5, numClasses = None, resultsFiles = False, workFraction = None):
+	parser = argparse.ArgumentParser(description = description)
+	parser.add_argument('--headless', action = 'store_true', help = 'run without the GUI')
+	parser.add_argument('--servers', dest = 'numServers', type = int, default = 2, help = 'number of servers')
+	parser.add_argument('--load', type = float, default = load, help = 'system load')
+	parser.add_argument('--proc-rate', dest = 'procRate', type = float, default = 0.5, help = 'processing rate (ignored for Bounded Pareto)')
+	parser.add_argument('--proc-dist', dest = 'procDist', default = 'Bounded Pareto',
+						choices = ['Poisson', 'Exponential', 'Uniform', 'Bounded Pareto', 'Custom'], help = 'processing distribution')
+	parser.add_argument('--error-min', dest = 'percErrorMin', type = float, default = -50, help = 'minimum percent error')
+	parser.add_argument('--error-max', dest = 'percErrorMax', type = float, default = 0, help = 'maximum percent error')
+	if numClasses is not None:
+		parser.add_argument('--classes', dest = 'numClasses', type = int, default = numClasses, help = 'number of classes')
+	parser.add_argument('--sim-length', dest = 'simLength', type = float, default = 5000000.0, help = 'simulation length')
+	parser.add_argument('--alpha', type = float, default = alpha, help = 'Bounded Pareto shape')
+	parser.add_argument('--lower', type = float, default = 1.0, help = 'Bounded Pareto smallest job size')
+	parser.add_argument('--upper', type = float, default = 10**6, help = 'Bounded Pareto largest job size')
+	parser.add_argument('--custom', dest = 'customEquation', default = "", help = 'inverse CDF for the Custom distribution, in terms of procRate and random')
+	if workFraction is not None:
+		parser.add_argument('--work-fraction', dest = 'workFraction', type = float, default = workFraction, help = 'fraction of the work carried by class 0 jobs')
+	parser.add_argument('--precision', type = float, default = None,
+						help = 'end the run once the confidence interval of the average number of jobs is within this fraction of it, e.g. 0.01')
+	parser.add_argument('--confidence', type = float, default = 0.95, choices = [0.90, 0.95, 0.99], help = 'confidence level of the reported intervals')
+	parser.add_argument('--warmup', action = 'store_true', help = 'leave the warm-up period found by MSER-5 out of the results')
+	parser.add_argument('--seed', type = int, default = None, help = 'random seed')
+	parser.add_argument('--log', dest = 'logFile', default = None, help = 'write console output to this file')
+	parser.add_argument('--trace-level', dest = 'traceLevel', default = None, choices = TRACE_LEVELS,
+						help = 'events traced to the console (default: debug with --log, off without)')
+	parser.add_argument('--no-save', dest = 'saveResults', action = 'store_false', help = 'do not save parameters to the database')
+	if resultsFiles:
+		parser.add_argument('--flush-interval', dest = 'flushInterval', type = int, default = 10000, help = 'rows buffered before the result files are written')
+		parser.add_argument('--trace-format', dest = 'traceFormat', default = 'text', choices = ['text', 'binary'],
+							help = 'write the number of jobs over time as text files or as a binary .npy trace')
+
+	args = vars(parser.parse_args())
+	del args['headless']
+	return args
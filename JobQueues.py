@@ -0,0 +1,254 @@
+#----------------------------------------------------------------------#
+# JobQueues.py
+#
+# Job queue data structures shared by the simulation scripts.
+#
+#----------------------------------------------------------------------#
+
+import heapq
+from collections import deque
+
+
+#----------------------------------------------------------------------#
+# Class: HeapQueue
+#
+# This class is used to store jobs sorted by ERPT on a binary heap, so
+# insert and removeHead are O(log n) instead of walking a linked list.
+# Ties go to the most recently inserted job, as in the sorted
+# LinkedList it replaces.
+#
+#----------------------------------------------------------------------#
+class HeapQueue(object):
+	def __init__(self):
+		self.heap = []
+		self.counter = 0	# insertion counter, breaks ties between equal ERPTs
+		self.Size = 0
+
+	# Insert job into queue (sorted by ERPT)
+	def insert(self, job):
+		self.counter += 1
+		heapq.heappush(self.heap, (job.ERPT, -self.counter, job))
+		self.Size += 1
+
+	# Remove first item in queue
+	def removeHead(self):
+		if (self.Size > 0):
+			heapq.heappop(self.heap)
+			self.Size -= 1
+		else:
+			print ("ERROR: The queue is already empty!!")
+
+	# Return first job in queue
+	def getHead(self):
+		if (self.Size > 0):
+			return self.heap[0][2]
+
+	def clear(self):
+		self.heap = []
+		self.counter = 0
+		self.Size = 0
+
+	def printList(self):
+		for entry in sorted(self.heap):
+			print ("%s, ERPT = %.4f"%(entry[2].name, entry[2].ERPT))
+
+
+#----------------------------------------------------------------------#
+# Class: ClassQueue
+#
+# This class is used to store jobs in one FIFO bucket per priority
+# class, so inserts and head removals are O(1) and the number of jobs
+# queued in each class is always known. Lower classes are served first.
+# Buckets are added as higher classes show up.
+#
+#----------------------------------------------------------------------#
+class ClassQueue(object):
+	def __init__(self, numClasses = 0):
+		self.buckets = [deque() for i in range(numClasses)]
+		self.Size = 0
+
+	# Insert job at the back of its class
+	def insertByClass(self, job):
+		while job.priorityClass >= len(self.buckets):
+			self.buckets.append(deque())
+		self.buckets[job.priorityClass].append(job)
+		self.Size += 1
+
+	# Insert job into the last class. The linked list version searched for
+	# class numClasses, which is never assigned, so the job always went to
+	# the back of the queue, i.e. the back of the last class.
+	def insertByLCFS(self, job, numClasses):
+		self.insertByClass(job)
+
+	# Remove first item in queue
+	def removeHead(self):
+		for bucket in self.buckets:
+			if bucket:
+				bucket.popleft()
+				self.Size -= 1
+				return
+		print ("ERROR: The queue is already empty!")
+
+	# Return first job in queue
+	def getHead(self):
+		for bucket in self.buckets:
+			if bucket:
+				return bucket[0]
+
+	def clear(self):
+		self.buckets = [deque() for bucket in self.buckets]
+		self.Size = 0
+
+	def printList(self, serverID):
+		print ("\nJOBS IN QUEUE %s: "%serverID)
+		for bucket in self.buckets:
+			for job in bucket:
+				print ("%s, class %s, ERPT = %.4f"%(job.name, job.priorityClass, job.ERPT))
+
+
+#----------------------------------------------------------------------#
+# Class: JobWindow
+#
+# This class is used to keep the last size jobs to arrive in a fixed
+# ring buffer, the oldest job being overwritten by each new one. Nothing
+# is allocated after it is made.
+#
+#----------------------------------------------------------------------#
+class JobWindow(object):
+	def __init__(self, size):
+		self.jobs = [None] * max(0, size)
+		self.next = 0			# slot the next job goes in
+		self.Size = 0
+
+	def append(self, job):
+		if self.jobs:
+			self.jobs[self.next] = job
+			self.next = (self.next + 1) % len(self.jobs)
+			self.Size = min(self.Size + 1, len(self.jobs))
+
+	# Number of jobs in the window with ERPT at most erpt
+	def rank(self, erpt):
+		count = 0
+		for job in self.jobs:
+			if (job is not None) and (job.ERPT <= erpt):
+				count += 1
+		return count
+
+	def clear(self):
+		self.jobs = [None] * len(self.jobs)
+		self.next = 0
+		self.Size = 0
+
+
+#----------------------------------------------------------------------#
+# Class: ServerCalendar
+#
+# This class is used to keep track of which servers are busy and when
+# their jobs complete, so the next completion, the lowest idle server
+# and the running job with the latest estimated completion are found in
+# O(log S) instead of scanning every server. Each start or stop bumps
+# the server's version, and heap entries from an older version are
+# dropped lazily when they reach the top.
+#
+#----------------------------------------------------------------------#
+class ServerCalendar(object):
+	def __init__(self, numServers):
+		self.numServers = numServers
+		self.busy = [False] * numServers
+		self.versions = [0] * numServers
+		self.completions = []			# (completionTime, serverID, version)
+		self.estimates = []				# (-estimatedCompletionTime, serverID, version)
+		self.idle = [(serverID, 0) for serverID in range(numServers)]	# (serverID, version)
+		self.NumBusy = 0
+
+	# Server starts a job that will complete at completionTime
+	def start(self, serverID, completionTime, estimatedCompletionTime = None):
+		self.busy[serverID] = True
+		self.versions[serverID] += 1
+		self.NumBusy += 1
+		version = self.versions[serverID]
+		self.push(self.completions, (completionTime, serverID, version))
+		if estimatedCompletionTime is not None:
+			self.push(self.estimates, (-estimatedCompletionTime, serverID, version))
+
+	# Server's job completed or was preempted
+	def stop(self, serverID):
+		if self.busy[serverID]:
+			self.busy[serverID] = False
+			self.versions[serverID] += 1
+			self.NumBusy -= 1
+			self.push(self.idle, (serverID, self.versions[serverID]))
+
+	# (completionTime, serverID) of the next completion, None if all servers are idle
+	def nextCompletion(self):
+		entry = self.top(self.completions)
+		if entry is not None:
+			return entry[0], entry[1]
+
+	# (estimatedCompletionTime, serverID) of the running job with the latest estimated completion
+	def latestEstimate(self):
+		entry = self.top(self.estimates)
+		if entry is not None:
+			return -entry[0], entry[1]
+
+	# Lowest numbered idle server, None if all servers are busy
+	def firstIdle(self):
+		heap = self.idle
+		while heap and heap[0][1] != self.versions[heap[0][0]]:
+			heapq.heappop(heap)
+		if heap:
+			return heap[0][0]
+
+	def top(self, heap):
+		while heap and heap[0][2] != self.versions[heap[0][1]]:
+			heapq.heappop(heap)
+		if heap:
+			return heap[0]
+
+	# Push onto a heap, dropping stale entries once it gets much larger than the number of servers
+	def push(self, heap, entry):
+		heapq.heappush(heap, entry)
+		if len(heap) > 4 * self.numServers + 64:
+			if heap is self.idle:
+				heap[:] = [e for e in heap if e[1] == self.versions[e[0]]]
+			else:
+				heap[:] = [e for e in heap if e[2] == self.versions[e[1]]]
+			heapq.heapify(heap)
+
+
+#----------------------------------------------------------------------#
+# Class: ServerHeap
+#
+# This class is used to keep one key per server on a heap, so the server
+# with the smallest key is found in O(log S). Setting or removing a key
+# bumps the server's version, and older entries are dropped lazily when
+# they reach the top. Ties go to the lowest numbered server.
+#
+#----------------------------------------------------------------------#
+class ServerHeap(object):
+	def __init__(self, numServers):
+		self.numServers = numServers
+		self.versions = [0] * numServers
+		self.present = [False] * numServers
+		self.heap = []				# (key, serverID, version)
+
+	def set(self, serverID, key):
+		self.versions[serverID] += 1
+		self.present[serverID] = True
+		heapq.heappush(self.heap, (key, serverID, self.versions[serverID]))
+		if len(self.heap) > 4 * self.numServers + 64:
+			self.heap = [e for e in self.heap if e[2] == self.versions[e[1]]]
+			heapq.heapify(self.heap)
+
+	def remove(self, serverID):
+		if self.present[serverID]:
+			self.versions[serverID] += 1
+			self.present[serverID] = False
+
+	# (key, serverID) of the smallest key, None if no server has one
+	def min(self):
+		heap = self.heap
+		while heap and heap[0][2] != self.versions[heap[0][1]]:
+			heapq.heappop(heap)
+		if heap:
+			return heap[0][0], heap[0][1]
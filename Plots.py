@@ -0,0 +1,155 @@
+#----------------------------------------------------------------------#
+# Plots.py
+#
+# Renders the plots of a run to local files instead of uploading them
+# to the plotly cloud, so nothing touches the network. Series are
+# decimated to at most PLOT_POINTS points first, keeping the min and
+# max of each stretch so spikes still show. HTML needs only plotly;
+# PNG and SVG are written by plotly.io.write_image, which needs its
+# local image exporter (orca or kaleido) installed.
+#
+# Run as a script to render the plots of every binary trace under a
+# directory, e.g. a whole sweep, on a pool of worker processes:
+#	python Plots.py DIR [--format html|png|svg] [--processes N] [--out DIR]
+#
+#----------------------------------------------------------------------#
+
+import argparse
+import multiprocessing
+import os
+import traceback
+
+import numpy
+import plotly.graph_objs as go
+from plotly.offline import plot
+
+from ResultsFiles import TraceReader, chunkPath, TRACE_COLUMNS
+
+PLOT_POINTS = 2000				# most points drawn per series
+PLOT_FORMATS = ['html', 'png', 'svg']
+PLOT_DIR = 'PLOTS'				# where the GUI writes its plots
+
+# Axis titles as the cloud plots had them
+AXIS_FONT = dict(family = 'Courier New, monospace', size = 18, color = '#7f7f7f')
+
+
+# At most maxPoints points of (times, values): the min and max of each of maxPoints/2 equal stretches, in time order
+def decimate(times, values, maxPoints = PLOT_POINTS):
+	times = numpy.asarray(times, dtype = numpy.float64)
+	values = numpy.asarray(values, dtype = numpy.float64)
+	count = len(values)
+	if count <= maxPoints:
+		return times, values
+
+	size = -(-count // (maxPoints // 2))		# rows per stretch, rounded up
+	starts = numpy.arange(0, count, size)
+	padded = numpy.concatenate([values, numpy.repeat(values[-1], len(starts) * size - count)]).reshape(-1, size)
+	keep = numpy.concatenate([starts + padded.argmin(axis = 1), starts + padded.argmax(axis = 1)])
+	keep = numpy.unique(numpy.minimum(keep, count - 1))
+	return times[keep], values[keep]
+
+
+def lineFigure(times, values, title, xTitle = 'Time', yTitle = 'Number of Jobs'):
+	times, values = decimate(times, values)
+	layout = go.Layout(title = title, xaxis = dict(title = xTitle, titlefont = AXIS_FONT), yaxis = dict(title = yTitle, titlefont = AXIS_FONT))
+	return go.Figure(data = [go.Scatter(x = times, y = values)], layout = layout)
+
+
+# Bars at 0, 1, ..., e.g. the average number of jobs of each class, with room for count bars (default one per value)
+def barFigure(values, title, count = None, xTitle = 'Classes', yTitle = 'Number of Jobs'):
+	values = numpy.asarray(values, dtype = numpy.float64)
+	if count is None:
+		count = len(values)
+	layout = go.Layout(title = title, xaxis = dict(title = xTitle, range = [-0.5, count - 0.5], titlefont = AXIS_FONT),
+					   yaxis = dict(title = yTitle, titlefont = AXIS_FONT))
+	return go.Figure(data = [go.Bar(y = values)], layout = layout)
+
+
+# Write fig to outDir/name.<format> and return the path. HTML files share one
+# plotly.min.js in outDir rather than each carrying a copy.
+def writeFigure(fig, name, outDir = PLOT_DIR, format = 'html'):
+	if format not in PLOT_FORMATS:
+		raise ValueError("Plot format must be one of %s, got %s"%(", ".join(PLOT_FORMATS), format))
+	if not os.path.isdir(outDir):
+		os.makedirs(outDir)
+	path = os.path.join(outDir, "%s.%s"%(name, format))
+	if format == 'html':
+		plot(fig, filename = path, auto_open = False, include_plotlyjs = 'directory')
+	else:
+		import plotly.io
+		plotly.io.write_image(fig, path, format = format)
+	return path
+
+
+# Plot a SeriesRecorder, as the GUI does at the end of a run
+def plotSeries(series, title, name, outDir = PLOT_DIR, format = 'html'):
+	times, values = series.points()
+	return writeFigure(lineFigure(times, values, title), name, outDir, format)
+
+
+# Number of jobs and average number of jobs over time of one binary trace, named after its directory
+def plotTrace(directory, outDir, format = 'html'):
+	trace = TraceReader(directory)
+	name = os.path.basename(os.path.normpath(directory))
+	times = trace.column('time')
+	paths = []
+	for column, title in (('numJobs', 'Number of Jobs Over Time'), ('avgNumJobs', 'Average Number of Jobs Over Time')):
+		fig = lineFigure(times, trace.column(column), title)
+		paths.append(writeFigure(fig, "%s_%s"%(name, column), outDir, format))
+	return paths
+
+
+# Trace directories under root, in path order
+def findTraces(root):
+	return sorted(directory for directory, dirs, files in os.walk(root)
+				  if os.path.basename(chunkPath(directory, TRACE_COLUMNS[0][0], 0)) in files)
+
+
+#----------------------------------------------------------------------#
+# Worker: plot one trace, keeping each trace's plots apart by the
+# directory it sits in relative to root. Errors are returned, not
+# raised, so one bad trace does not stop the others.
+#----------------------------------------------------------------------#
+def renderTask(task):
+	directory, root, outDir, format = task
+	relative = os.path.relpath(os.path.dirname(os.path.abspath(directory)), os.path.abspath(root))
+	try:
+		return directory, plotTrace(directory, os.path.normpath(os.path.join(outDir, relative)), format), None
+	except Exception:
+		return directory, [], traceback.format_exc().strip().splitlines()[-1]
+
+
+# Plot every trace under root on a pool of processes, returning (directory, paths, error) per trace
+def renderTraces(root, outDir, format = 'html', processes = None):
+	tasks = [(directory, root, outDir, format) for directory in findTraces(root)]
+	if not tasks:
+		return []
+	pool = multiprocessing.Pool(processes or multiprocessing.cpu_count())
+	try:
+		results = pool.map(renderTask, tasks)
+		pool.close()
+	except BaseException:		# stop the workers on any error, or join() would wait on a pool still running
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+	return results
+
+
+#----------------------------------------------------------------------#
+def main():
+	parser = argparse.ArgumentParser(description = 'Render the plots of every binary trace under a directory to local files')
+	parser.add_argument('directory', help = 'directory to look for traces in, e.g. a sweep output directory')
+	parser.add_argument('--format', default = 'html', choices = PLOT_FORMATS, help = 'file format of the plots')
+	parser.add_argument('--processes', type = int, default = None, help = 'worker processes (default: one per core)')
+	parser.add_argument('--out', dest = 'outDir', default = None, help = 'output directory (default: DIRECTORY/plots)')
+	args = parser.parse_args()
+
+	outDir = args.outDir or os.path.join(args.directory, 'plots')
+	results = renderTraces(args.directory, outDir, args.format, args.processes)
+	for directory, paths, error in results:
+		print ("%s: %s"%(directory, error or ", ".join(paths)))
+	print ("%d traces, %d failed. Plots in %s"%(len(results), len([error for directory, paths, error in results if error]), outDir))
+
+
+if __name__ == '__main__': main()
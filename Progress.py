@@ -0,0 +1,111 @@
+#----------------------------------------------------------------------#
+# Progress.py
+#
+# Runs a simulation on a worker thread, so the Tk main loop is free to
+# repaint the window and answer the Stop button while it runs. The run
+# reports back over a queue: status messages, and every PROGRESS_INTERVAL
+# seconds a snapshot of its simulated time, events per second, current
+# and average number of jobs. The GUI polls the queue from a Tk timer.
+#
+#----------------------------------------------------------------------#
+
+try:
+	from queue import Queue, Empty
+except ImportError:		# Python 2
+	from Queue import Queue, Empty
+import threading
+import time
+import traceback
+
+PROGRESS_INTERVAL = 0.5		# seconds between progress snapshots
+PROGRESS_EVENTS = 1000		# events between looks at the clock
+
+
+#----------------------------------------------------------------------#
+# Class: Snapshot
+#
+# Progress of a run at one moment, as posted to the GUI.
+#
+#----------------------------------------------------------------------#
+class Snapshot(object):
+	def __init__(self, simTime, events, eventRate, numJobs, avgNumJobs):
+		self.simTime = simTime
+		self.events = events
+		self.eventRate = eventRate		# events per second of wall-clock time since the last snapshot
+		self.numJobs = numJobs
+		self.avgNumJobs = avgNumJobs
+
+	# One line for the status bar
+	def describe(self):
+		return "Simulating... time = %.1f, %d events (%.0f/s), jobs = %d, average = %.4f"%(self.simTime, self.events, self.eventRate, self.numJobs, self.avgNumJobs)
+
+
+#----------------------------------------------------------------------#
+# Class: WorkerConsole
+#
+# Stands in for the GUI as the "master" of a MachineClass running on a
+# worker thread, and as its progress reporter (MachineClass.Progress).
+# Console lines go straight to the GUI's ConsoleBuffer. Nothing here
+# touches Tk: status messages and snapshots are put on the queue for
+# the main thread.
+#
+#----------------------------------------------------------------------#
+class WorkerConsole(object):
+	def __init__(self, consoleBuffer, interval = PROGRESS_INTERVAL):
+		self.consoleBuffer = consoleBuffer
+		self.interval = interval
+		self.queue = Queue()
+		self.events = 0
+		self.lastEvents = 0
+		self.lastReport = time.time()
+
+	def writeToConsole(self, text = ' '):
+		self.consoleBuffer.write(text)
+
+	def updateStatusBar(self, text = ' '):
+		self.queue.put(('status', text))
+
+	# Called by the run after every event, posts a snapshot at most once per interval
+	def tick(self, sim):
+		self.events += 1
+		if self.events % PROGRESS_EVENTS == 0:
+			now = time.time()
+			if now - self.lastReport >= self.interval:
+				eventRate = (self.events - self.lastEvents) / (now - self.lastReport)
+				self.queue.put(('progress', Snapshot(sim.CurrentTime, self.events, eventRate, sim.currentNumJobs, sim.NumJobsStats.mean())))
+				self.lastEvents = self.events
+				self.lastReport = now
+
+	# Messages posted since the last call, oldest first, as (kind, value) with kind 'status' or 'progress'
+	def take(self):
+		messages = []
+		while True:
+			try:
+				messages.append(self.queue.get_nowait())
+			except Empty:
+				return messages
+
+
+#----------------------------------------------------------------------#
+# Class: SimulationThread
+#
+# Runs function(*args) on a daemon thread, so closing the window ends
+# it. An exception is kept in error (its traceback in errorText) for
+# the main thread to report once the thread has finished.
+#
+#----------------------------------------------------------------------#
+class SimulationThread(threading.Thread):
+	def __init__(self, function, args):
+		threading.Thread.__init__(self)
+		self.daemon = True
+		self.function = function
+		self.args = args
+		self.error = None
+		self.errorText = ""
+
+	def run(self):
+		try:
+			self.function(*self.args)
+		except Exception as error:
+			self.error = error
+			self.errorText = traceback.format_exc()
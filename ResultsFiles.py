@@ -0,0 +1,210 @@
+#----------------------------------------------------------------------#
+# ResultsFiles.py
+#
+# Writers for the per-event result files in ./MULTI_SERVER_RESULTS/,
+# either as "%f,%f" text files or as a binary columnar trace.
+#
+# Run as a script to summarize a binary trace or convert it back to
+# the text format:
+#	python ResultsFiles.py TRACE_DIR [--num NUM.txt] [--avg AVG.txt]
+#
+#----------------------------------------------------------------------#
+
+import argparse
+import itertools
+import math
+import os
+import time
+
+import numpy
+
+# Columns of a binary trace and their types
+TRACE_COLUMNS = [('time', numpy.float64), ('numJobs', numpy.int32), ('avgNumJobs', numpy.float64)]
+
+runCounter = itertools.count()
+
+
+# Key of one run for its result file names, so runs with the same parameters, side by side in threads or processes
+# or back to back, never write to the same files: its seed, start time, process and count of runs in the process
+def runKey(seed):
+	return "seed=%s_%s_%d_%d"%(seed, time.strftime('%Y%m%d-%H%M%S'), os.getpid(), next(runCounter))
+
+
+#----------------------------------------------------------------------#
+# Class: ResultsWriter
+#
+# This class is used to append rows to a text results file. The file
+# is kept open for the whole run and rows are buffered in memory, then
+# written out every flushInterval rows and when the writer is closed.
+#
+#----------------------------------------------------------------------#
+class ResultsWriter(object):
+	def __init__(self, path, flushInterval = 10000):
+		directory = os.path.dirname(path)
+		if directory and not os.path.isdir(directory):
+			os.makedirs(directory)
+
+		self.path = path
+		self.flushInterval = max(1, int(flushInterval))
+		self.rows = []
+		self.file = open(path, "a")
+
+	def write(self, text):
+		self.rows.append(text)
+		if len(self.rows) >= self.flushInterval:
+			self.flush()
+
+	def flush(self):
+		if self.rows:
+			self.file.write(''.join(self.rows))
+			self.rows = []
+		self.file.flush()
+
+	def close(self):
+		if self.file is not None:
+			self.flush()
+			self.file.close()
+			self.file = None
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.close()
+
+
+def chunkPath(directory, column, index):
+	return os.path.join(directory, "%s_%05d.npy"%(column, index))
+
+
+#----------------------------------------------------------------------#
+# Class: TraceWriter
+#
+# This class is used to write the number of jobs in the system over
+# time as a binary columnar trace: a directory of .npy chunks, one file
+# per column per chunk, with typed float64/int32 columns. Rows are kept
+# in preallocated arrays until a chunk is full. The average number of
+# jobs column is worked out a whole chunk at a time as it is written,
+# not at every event. A trace directory holds one run, so the directory
+# must not have a trace in it already.
+#
+#----------------------------------------------------------------------#
+class TraceWriter(object):
+	def __init__(self, directory, chunkSize = 1000000, startTime = 0.0):
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+
+		self.directory = directory
+		self.chunkSize = max(1, int(chunkSize))
+		self.columns = [numpy.empty(self.chunkSize, dtype) for name, dtype in TRACE_COLUMNS]
+		if os.path.exists(chunkPath(directory, TRACE_COLUMNS[0][0], 0)):
+			raise ValueError("%s already holds a trace"%directory)
+		self.rows = 0
+		self.chunk = 0
+		self.startTime = startTime
+		self.lastTime = startTime
+		self.areas = []				# integral of the number of jobs dt over each chunk written
+		self.closed = False
+
+	# numJobs was held from the previous row up to time
+	def append(self, time, numJobs):
+		row = self.rows
+		self.columns[0][row] = time
+		self.columns[1][row] = numJobs
+		self.rows += 1
+		if self.rows == self.chunkSize:
+			self.flush()
+
+	# Time-average number of jobs up to each row of the chunk
+	def averageChunk(self):
+		times = self.columns[0][:self.rows]
+		areas = numpy.cumsum(self.columns[1][:self.rows] * numpy.diff(numpy.concatenate([[self.lastTime], times])))
+		self.areas.append(float(areas[-1]))
+		areas += math.fsum(self.areas[:-1])
+		elapsed = times - self.startTime
+		numpy.divide(areas, elapsed, out = self.columns[2][:self.rows], where = elapsed > 0)
+		self.columns[2][:self.rows][elapsed <= 0] = 0.0
+		self.lastTime = times[-1]
+
+	def flush(self):
+		if self.rows > 0:
+			self.averageChunk()
+			for (name, dtype), values in zip(TRACE_COLUMNS, self.columns):
+				numpy.save(chunkPath(self.directory, name, self.chunk), values[:self.rows])
+			self.chunk += 1
+			self.rows = 0
+
+	def close(self):
+		if not self.closed:
+			self.flush()
+			self.closed = True
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		self.close()
+
+
+#----------------------------------------------------------------------#
+# Class: TraceReader
+#
+# This class is used to read the trace of one run written by TraceWriter.
+# Chunks are memory-mapped by default, so only the parts that are used get read
+# from disk.
+#
+#----------------------------------------------------------------------#
+class TraceReader(object):
+	def __init__(self, directory, mmap = True):
+		self.directory = directory
+		self.mmapMode = 'r' if mmap else None
+		self.numChunks = 0
+		while os.path.exists(chunkPath(directory, TRACE_COLUMNS[0][0], self.numChunks)):
+			self.numChunks += 1
+
+	# Iterate over the chunks of one column
+	def chunks(self, column):
+		for index in range(self.numChunks):
+			yield numpy.load(chunkPath(self.directory, column, index), mmap_mode = self.mmapMode)
+
+	# Whole column as one array, still memory-mapped if there is only one chunk
+	def column(self, column):
+		arrays = list(self.chunks(column))
+		if len(arrays) == 0:
+			return numpy.empty(0, dict(TRACE_COLUMNS)[column])
+		if len(arrays) == 1:
+			return arrays[0]
+		return numpy.concatenate(arrays)
+
+	def __len__(self):
+		return sum(len(values) for values in self.chunks(TRACE_COLUMNS[0][0]))
+
+	# Write the trace back out in the "%f,%f" text format of ResultsWriter
+	def writeText(self, numPath = None, avgPath = None):
+		for path, column in ((numPath, 'numJobs'), (avgPath, 'avgNumJobs')):
+			if path is None:
+				continue
+			with ResultsWriter(path) as writer:
+				for times, values in zip(self.chunks('time'), self.chunks(column)):
+					for time, value in zip(times.tolist(), values.tolist()):
+						writer.write("%f,%f\n"%(time, value))
+
+
+#----------------------------------------------------------------------#
+def main():
+	parser = argparse.ArgumentParser(description = 'Summarize a binary trace, or convert it to text result files')
+	parser.add_argument('directory', help = 'trace directory written by TraceWriter')
+	parser.add_argument('--num', dest = 'numPath', default = None, help = 'write number of jobs to this text file')
+	parser.add_argument('--avg', dest = 'avgPath', default = None, help = 'write average number of jobs to this text file')
+	args = parser.parse_args()
+
+	trace = TraceReader(args.directory)
+	times = trace.column('time')
+	print ("%s: %d rows in %d chunks"%(args.directory, len(times), trace.numChunks))
+	if len(times) > 0:
+		numJobs = trace.column('numJobs')
+		print ("Time = %f to %f, max number of jobs = %d, final average = %f"%(times[0], times[-1], numJobs.max(), trace.column('avgNumJobs')[-1]))
+	trace.writeText(args.numPath, args.avgPath)
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,221 @@
+#----------------------------------------------------------------------#
+# ResultsStore.py
+#
+# One SQLite database for the results of every script, in place of a
+# pandas DataFrame written with to_sql to a .db file per script. Runs
+# are stored in three tables:
+#	runs			parameters of each run, one row per run
+#	summaries		its summary statistics, keyed by run
+#	classMetrics	the average number of jobs in each class, keyed by
+#					run and class, for the class-based scripts
+# The database is in WAL mode, so it can be read while a sweep writes
+# to it, and runs are written in batches with executemany, one
+# transaction per batch. runs is indexed on the parameters sweeps are
+# looked up by.
+#
+# Run as a script to list the stored runs matching some parameters:
+#	python ResultsStore.py [DB] [--variant NAME] [--servers N] [--load X] ...
+#
+#----------------------------------------------------------------------#
+
+import argparse
+import sqlite3
+import threading
+import time
+
+RESULTS_DB = 'MultiServerResults.db'		# shared by all scripts, in the directory they are run from
+
+# Columns of runs and summaries, in table order, after the run id
+RUN_COLUMNS = ['variant', 'servers', 'load', 'arrRate', 'arrDist', 'procRate', 'procDist', 'alpha', 'lower', 'upper',
+			   'percErrorMin', 'percErrorMax', 'numClasses', 'simLength', 'seed', 'precision', 'confidence', 'warmup', 'threshold', 'created']
+SUMMARY_COLUMNS = ['avgNumJobs', 'numJobsHalfWidth', 'numJobsVar', 'numJobsMin', 'numJobsMax', 'responseTime',
+				   'responseTimeHalfWidth', 'simTime', 'warmupTime', 'seconds']
+CLASS_COLUMNS = ['avgNumJobs', 'halfWidth']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+	id				INTEGER PRIMARY KEY,
+	variant			TEXT NOT NULL,		-- script, e.g. SRPTE_Multi
+	servers			INTEGER,
+	load			REAL,
+	arrRate			REAL,
+	arrDist			TEXT,
+	procRate		REAL,
+	procDist		TEXT,
+	alpha			REAL,
+	lower			REAL,				-- L, smallest job size
+	upper			REAL,				-- U, largest job size
+	percErrorMin	REAL,
+	percErrorMax	REAL,
+	numClasses		INTEGER,
+	simLength		REAL,
+	seed			INTEGER,
+	precision		REAL,
+	confidence		REAL,
+	warmup			INTEGER,
+	threshold		REAL,				-- class threshold of SRPTE_Multi_KnownDist
+	created			TEXT
+);
+CREATE INDEX IF NOT EXISTS runsByParams ON runs (variant, servers, load, alpha, upper, percErrorMin, percErrorMax);
+
+CREATE TABLE IF NOT EXISTS summaries (
+	run						INTEGER PRIMARY KEY REFERENCES runs (id),
+	avgNumJobs				REAL,
+	numJobsHalfWidth		REAL,
+	numJobsVar				REAL,
+	numJobsMin				REAL,
+	numJobsMax				REAL,
+	responseTime			REAL,
+	responseTimeHalfWidth	REAL,
+	simTime					REAL,
+	warmupTime				REAL,
+	seconds					REAL
+);
+
+CREATE TABLE IF NOT EXISTS classMetrics (
+	run				INTEGER REFERENCES runs (id),
+	class			INTEGER,
+	avgNumJobs		REAL,
+	halfWidth		REAL,
+	PRIMARY KEY (run, class)
+);
+"""
+
+
+#----------------------------------------------------------------------#
+# Summary statistics of a MachineClass that has run, as a dict of
+# SUMMARY_COLUMNS (but seconds) and 'classes': a list of
+# (avgNumJobs, halfWidth) per class, empty for scripts without classes.
+#----------------------------------------------------------------------#
+def summarize(machine):
+	numJobs = machine.NumJobsBatches.estimate()
+	responseTimes = machine.ResponseTimes.estimate()
+	summary = {'avgNumJobs': machine.AvgNumJobs,
+			   'numJobsHalfWidth': numJobs.halfWidth(machine.Confidence),
+			   'numJobsVar': machine.NumJobsStats.variance(),
+			   'numJobsMin': machine.NumJobsStats.min,
+			   'numJobsMax': machine.NumJobsStats.max,
+			   'responseTime': responseTimes.mean(),
+			   'responseTimeHalfWidth': responseTimes.halfWidth(machine.Confidence),
+			   'simTime': machine.CurrentTime,
+			   'warmupTime': machine.NumJobsBatches.truncation(),
+			   'classes': []}
+	classStats = getattr(machine, 'ClassStats', None)
+	if classStats:
+		warmup = machine.warmupTime()
+		halfWidths = [stats.batches.rebatch(warmup).halfWidth(machine.Confidence) for stats in classStats]
+		summary['classes'] = list(zip(machine.NumJobsClass, halfWidths))
+	return summary
+
+
+#----------------------------------------------------------------------#
+# Class: ResultsStore
+#
+# A connection to the results database, creating the tables if need be.
+# addRuns() takes records: dicts with any of RUN_COLUMNS and
+# SUMMARY_COLUMNS (missing ones are stored as NULL) and optionally
+# 'classes' as returned by summarize(). Safe to share between threads;
+# processes should each open their own, or better hand their records to
+# one process that writes them in batches, as Sweep.py does.
+#
+#----------------------------------------------------------------------#
+class ResultsStore(object):
+	def __init__(self, path = RESULTS_DB, timeout = 30.0):
+		self.path = path
+		self.lock = threading.Lock()
+		# Transactions are begun and ended explicitly, see addRuns
+		self.conn = sqlite3.connect(path, timeout = timeout, isolation_level = None, check_same_thread = False)
+		self.conn.execute('PRAGMA journal_mode = WAL')
+		self.conn.execute('PRAGMA synchronous = NORMAL')		# safe with WAL, commits no longer wait on an fsync
+		self.conn.executescript(SCHEMA)
+
+	# Store records in one transaction and return their run ids
+	def addRuns(self, records):
+		records = list(records)
+		if not records:
+			return []
+		created = time.strftime('%Y-%m-%d %H:%M:%S')
+		with self.lock:
+			cursor = self.conn.cursor()
+			cursor.execute('BEGIN IMMEDIATE')		# take the write lock now, so the ids below stay free
+			try:
+				first = cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM runs').fetchone()[0]
+				ids = list(range(first, first + len(records)))
+				cursor.executemany('INSERT INTO runs (id, %s) VALUES (?%s)'%(', '.join(RUN_COLUMNS), ', ?' * len(RUN_COLUMNS)),
+								   [[runId] + [record.get(column, created if column == 'created' else None) for column in RUN_COLUMNS]
+									for runId, record in zip(ids, records)])
+				cursor.executemany('INSERT INTO summaries (run, %s) VALUES (?%s)'%(', '.join(SUMMARY_COLUMNS), ', ?' * len(SUMMARY_COLUMNS)),
+								   [[runId] + [record.get(column) for column in SUMMARY_COLUMNS] for runId, record in zip(ids, records)])
+				cursor.executemany('INSERT INTO classMetrics (run, class, %s) VALUES (?, ?%s)'%(', '.join(CLASS_COLUMNS), ', ?' * len(CLASS_COLUMNS)),
+								   [[runId, priorityClass] + list(metrics) for runId, record in zip(ids, records)
+									for priorityClass, metrics in enumerate(record.get('classes') or [])])
+				cursor.execute('COMMIT')
+			except BaseException:
+				cursor.execute('ROLLBACK')
+				raise
+		return ids
+
+	def addRun(self, record):
+		return self.addRuns([record])[0]
+
+	# Runs with their summaries whose parameters equal the given ones, e.g. find(variant = 'SRPTE_Multi', alpha = 1.5),
+	# as dicts of 'id', RUN_COLUMNS and SUMMARY_COLUMNS
+	def find(self, **params):
+		unknown = set(params) - set(RUN_COLUMNS)
+		if unknown:
+			raise ValueError("Unknown run columns: %s"%", ".join(sorted(unknown)))
+		columns = ['id'] + RUN_COLUMNS + SUMMARY_COLUMNS
+		where = ' AND '.join('runs.%s = ?'%column for column in sorted(params))
+		query = 'SELECT %s FROM runs LEFT JOIN summaries ON summaries.run = runs.id%s ORDER BY runs.id'%(
+				', '.join('runs.id' if column == 'id' else column for column in columns), ' WHERE ' + where if where else '')
+		with self.lock:
+			rows = self.conn.execute(query, [params[column] for column in sorted(params)]).fetchall()
+		return [dict(zip(columns, row)) for row in rows]
+
+	# (avgNumJobs, halfWidth) of each class of a run, by class
+	def classMetrics(self, runId):
+		with self.lock:
+			return [tuple(row) for row in self.conn.execute('SELECT avgNumJobs, halfWidth FROM classMetrics WHERE run = ? ORDER BY class', (runId,))]
+
+	def close(self):
+		if self.conn is not None:
+			self.conn.close()
+			self.conn = None
+
+
+# One store per database per process, opened on first use rather than at import
+sharedStores = {}
+sharedLock = threading.Lock()
+
+def sharedStore(path = RESULTS_DB):
+	with sharedLock:
+		if path not in sharedStores:
+			sharedStores[path] = ResultsStore(path)
+		return sharedStores[path]
+
+
+#----------------------------------------------------------------------#
+def main():
+	parser = argparse.ArgumentParser(description = 'List stored runs matching some parameters')
+	parser.add_argument('db', nargs = '?', default = RESULTS_DB, help = 'results database (default: %s)'%RESULTS_DB)
+	parser.add_argument('--variant', default = None, help = 'script, e.g. SRPTE_Multi')
+	parser.add_argument('--servers', type = int, default = None)
+	parser.add_argument('--load', type = float, default = None)
+	parser.add_argument('--alpha', type = float, default = None)
+	parser.add_argument('--upper', type = float, default = None)
+	parser.add_argument('--error-min', dest = 'percErrorMin', type = float, default = None)
+	parser.add_argument('--error-max', dest = 'percErrorMax', type = float, default = None)
+	args = vars(parser.parse_args())
+
+	store = ResultsStore(args.pop('db'))
+	start = time.time()
+	runs = store.find(**dict((key, value) for key, value in args.items() if value is not None))
+	seconds = time.time() - start
+	for run in runs:
+		print ("%d %s servers=%s load=%s alpha=%s U=%s errors=[%s, %s] avgNumJobs=%s +/- %s"%(run['id'], run['variant'], run['servers'], run['load'],
+				run['alpha'], run['upper'], run['percErrorMin'], run['percErrorMax'], run['avgNumJobs'], run['numJobsHalfWidth']))
+	print ("%d runs in %.1f ms"%(len(runs), seconds * 1000))
+	store.close()
+
+
+if __name__ == '__main__': main()
@@ -9,26 +9,41 @@
 # Rachel Mailach
 #----------------------------------------------------------------------#
 
-from tkinter import *
-#from tkinter import messagebox
-from tkinter import ttk 
-from tkinter import filedialog
+try:
+	from tkinter import *
+	#from tkinter import messagebox
+	from tkinter import ttk 
+	from tkinter import filedialog
+except ImportError:		# no Tk on display-less compute nodes, only runHeadless() is usable
+	Tk = LabelFrame = object
 from datetime import datetime
 
-import plotly.plotly as py
-from plotly.graph_objs import Scatter
-import plotly.graph_objs as go
-
 import random
-import sqlite3
-import pandas
-
-conn=sqlite3.connect('MultiServerDatabase_SRPT.db')
-
-NumJobs = []
-AvgNumJobs = []
-NumJobsTime = []
-NUM_SERVERS = 0
+import sys
+
+from Headless import HeadlessConsole, parseArgs
+from ConsoleBuffer import ConsoleBuffer, REFRESH_INTERVAL
+from EventTrace import EventTrace, TRACE_OFF, TRACE_SUMMARY, TRACE_EVENT, TRACE_DEBUG
+from Progress import WorkerConsole, SimulationThread
+from ResultsStore import sharedStore, summarize, RESULTS_DB
+from Plots import plotSeries
+from ResultsFiles import ResultsWriter, TraceWriter, runKey
+from TimeSeries import SeriesRecorder, TimeAverage
+from BatchMeans import WarmupBatches
+from Samplers import makeGenerator, makeServiceSampler, makeArrivalSampler, makeErrorSampler
+from JobQueues import HeapQueue, ServerCalendar
+
+VARIANT = 'SRPTE_Multi'		# name of the runs of this script in the results database (see ResultsStore.py)
+
+# Console lines of the trace records, by kind (see EventTrace.py)
+TRACE_FORMATS = {
+	'arrival':		"%.6f | %s arrived, ERPT = %.5f",
+	'preempt':		"%.6f | %s preempting %s",
+	'requeue':		"%.6f | %s added back to queue, ERPT = %.5f",
+	'start':		"%.6f | %s processing on server %s, ERPT=%s",
+	'completion':	"%.6f | %s COMPLTED at server %s",
+	'end':			"%.6f | run ended after %s arrivals",
+}
 
 #----------------------------------------------------------------------#
 # Class: GUI
@@ -41,10 +56,11 @@ class GUI(Tk):
 		Tk.__init__(self, master)
 		self.master = master        # reference to parent
 		self.statusText = StringVar()
-		global SEED
-		#SEED = random.randint(0, 1000000000)
-		SEED = 994863731
-		random.seed(SEED)
+		#self.seed = random.randint(0, 1000000000)
+		self.seed = 994863731
+		self.rand = random.Random(self.seed)	# one stream for all runs from this window
+		self.sim = None							# MachineClass of the current run
+		self.worker = None						# SimulationThread running it
 
 		# Create the input frame
 		self.frameIn = Input(self)
@@ -63,6 +79,12 @@ class GUI(Tk):
 		# Bind clear button
 		self.bind("<<output_clear>>", self.clearConsole)
 
+		# Bind log button
+		self.bind("<<output_log>>", self.openLog)
+
+		# Bind log events checkbox
+		self.bind("<<output_log_events>>", self.setLogEvents)
+
 		# Bind stop button
 		self.bind("<<stop_sim>>", self.stopSimulation)		
 
@@ -73,9 +95,11 @@ class GUI(Tk):
 		# Initialize console
 		self.consoleFrame = Frame(self.frameOut)
 		self.console = Text(self.consoleFrame, wrap = WORD)		
+		self.consoleBuffer = ConsoleBuffer()	# last lines written, painted into the console on a timer
 		self.makeConsole()
 		self.printIntro()
 		self.updateStatusBar("Waiting for submit...")
+		self.after(REFRESH_INTERVAL, self.refreshConsole)
 
 	def makeConsole(self):
 		#self.consoleFrame = Frame(self.frameOut)
@@ -88,16 +112,34 @@ class GUI(Tk):
 		self.console.grid(column=0, row=0)
 		self.scrollbar.grid(column=1, row=0, sticky='NS')
 
+	# Lines only go to the buffer, refreshConsole paints them from the main loop
 	def writeToConsole(self, text = ' '):
-		self.console.config(state=NORMAL)       # make console editable
-		self.console.insert(END, '%s\n'%text)
-		self.update()
-		self.console.yview(END)					# auto-scroll
-		self.console.config(state=DISABLED)     # disable (non-editable) console
+		self.consoleBuffer.write(text)
+
+	# Paint the lines written since the last repaint, keeping the console to the buffer's length
+	def refreshConsole(self):
+		lines = self.consoleBuffer.takePending()
+		if lines:
+			self.console.config(state=NORMAL)       # make console editable
+			self.console.insert(END, '%s\n'%'\n'.join(lines))
+			extra = int(self.console.index('end-1c').split('.')[0]) - 1 - self.consoleBuffer.maxLines
+			if extra > 0:
+				self.console.delete('1.0', '%d.0'%(extra + 1))
+			self.console.yview(END)					# auto-scroll
+			self.console.config(state=DISABLED)     # disable (non-editable) console
+			self.consoleBuffer.flushLog()
+		self.after(REFRESH_INTERVAL, self.refreshConsole)
+
+	# Write every console line from now on to a file, the console itself only keeps the last ones
+	def openLog(self, event):
+		filename = filedialog.asksaveasfilename(title="Log console to...", defaultextension='.txt')
+		if filename:
+			self.consoleBuffer.openLog(filename)
+			self.updateStatusBar("Logging console to %s"%filename)
 
 	def saveData(self, event):
 		# Get filename
-		filename = fileDialog.asksaveasfilename(title="Save as...", defaultextension='.txt')
+		filename = filedialog.asksaveasfilename(title="Save as...", defaultextension='.txt')
 		
 		if filename:
 			file = open(filename, mode='w')
@@ -126,6 +168,7 @@ class GUI(Tk):
 			myFile.close()
 
 	def clearConsole(self, event):
+		self.consoleBuffer.clear()
 		self.console.config(state=NORMAL)       # make console editable
 		self.console.delete('1.0', END)
 		self.console.config(state=DISABLED)     # disable (non-editable) console
@@ -136,27 +179,34 @@ class GUI(Tk):
 	def printIntro(self):
 		self.writeToConsole("SRPTE \n\n This application simulates a single server with Poisson arrivals and processing times of a general distribution. Each arrival has an estimation error within a percent error taken as input. Jobs are serviced in order of shortest remaining processing time.")
 
-	def saveParams(self, numServers, load, arrRate, arrDist, procRate, procDist, percErrorMin, percErrorMax, simLength, alpha, lower, upper):
-		##params = pandas.DataFrame(columns=('seed', 'numServers', 'load', 'arrRate', 'arrDist', 'procRate', 'procDist', 'alpha', 'lower', 'upper', 'percErrorMin', 'percErrorMax', 'simLength'))
-		print (SEED)
-		params = pandas.DataFrame({	'seed' : [SEED],
-									'numServers' : [numServers],
-									'load' : [load],
-									'arrRate' : [arrRate],
-									'arrDist' : [arrDist],
-									'procRate' : [procRate],
-									'procDist' : [procDist],
-									'alpha' : [alpha],
-									'lower' : [lower],
-									'upper' : [upper],
-									'percErrorMin' : [percErrorMin],
-									'percErrorMax' : [percErrorMax],
-									'simLength' : [simLength],
-									'avgNumJobs' : [MachineClass.AvgNumJobs]
-									})
-
-		params.to_sql(name='parameters', con=conn, if_exists='append')
-		print (params)
+	def saveParams(self, numServers, load, arrRate, arrDist, procRate, procDist, percErrorMin, percErrorMax, simLength, alpha, lower, upper, seed, avgNumJobs, MC = None):
+		print (seed)
+		record = {	'variant' : VARIANT,
+					'seed' : seed,
+					'servers' : numServers,
+					'load' : load,
+					'arrRate' : arrRate,
+					'arrDist' : arrDist,
+					'procRate' : procRate,
+					'procDist' : procDist,
+					'alpha' : alpha,
+					'lower' : lower,
+					'upper' : upper,
+					'percErrorMin' : percErrorMin,
+					'percErrorMax' : percErrorMax,
+					'simLength' : simLength,
+					'avgNumJobs' : avgNumJobs}
+		if MC is not None:		# the run's summary statistics and per-class metrics, beside its parameters
+			record.update(summarize(MC))
+			record.update(precision = MC.NumJobsBatches.precision, confidence = MC.Confidence, warmup = MC.Warmup)
+		runId = sharedStore().addRun(record)
+		print ("Run %d saved to %s"%(runId, RESULTS_DB))
+
+	def printResults(self, MC):
+		self.writeToConsole("--------------------------------------------------------------------------------")
+		self.writeToConsole("RESULTS:")
+		for line in MC.results():
+			self.writeToConsole(line)
 
 	def printParams(self, numServers, load, arrDist, procRate, procDist, percErrorMin, percErrorMax, simLength):
 		self.writeToConsole("--------------------------------------------------------------------------------")
@@ -175,73 +225,66 @@ class GUI(Tk):
 			var += (avg - i)**2
 		return var/len(List)
 
-	def plotNumJobsInSys(self):
-		py.sign_in('mailacrs','wowbsbc0qo')
-		trace0 = Scatter(x=NumJobsTime, y=NumJobs)
-		data = [trace0]
-		layout = go.Layout(
-			title='Number of Jobs Over Time',
-			xaxis=dict(
-				title='Time',
-				titlefont=dict(
-				family='Courier New, monospace',
-				size=18,
-				color='#7f7f7f'
-			)
-		),
-			yaxis=dict(
-				title='Number of Jobs',
-				titlefont=dict(
-				family='Courier New, monospace',
-				size=18,
-				color='#7f7f7f'
-			)
-		)
-		)
-		fig = go.Figure(data=data, layout=layout)
-		unique_url = py.plot(fig, filename = 'SRPT_NumJobsInSys')	
-
-	def plotAvgNumJobsInSys(self):
-		py.sign_in('mailacrs','wowbsbc0qo')
-		trace0 = Scatter(x=NumJobsTime, y=AvgNumJobs)
-		data = [trace0]
-		layout = go.Layout(
-			title='Average Number of Jobs Over Time',
-			xaxis=dict(
-				title='Time',
-				titlefont=dict(
-				family='Courier New, monospace',
-				size=18,
-				color='#7f7f7f'
-			)
-		),
-			yaxis=dict(
-				title='Number of Jobs',
-				titlefont=dict(
-				family='Courier New, monospace',
-				size=18,
-				color='#7f7f7f'
-			)
-		)
-		)
-		fig = go.Figure(data=data, layout=layout)
-		unique_url = py.plot(fig, filename = 'SRPT_AvgNumJobsInSys')
+	def plotNumJobsInSys(self, series):
+		path = plotSeries(series, 'Number of Jobs Over Time', 'SRPT_NumJobsInSys')
+		self.writeToConsole("Plot written to %s"%path)
 
+	def plotAvgNumJobsInSys(self, series):
+		path = plotSeries(series, 'Average Number of Jobs Over Time', 'SRPT_AvgNumJobsInSys')
+		self.writeToConsole("Plot written to %s"%path)
 
 	def stopSimulation(self, event):
-		MachineClass.StopSim = True
+		if self.sim is not None:
+			self.sim.StopSim = True
+
+	# Trace every event to the console (debug) or only the summary, also for a run already going
+	def setLogEvents(self, event):
+		if self.sim is not None:
+			self.sim.Trace.level = TRACE_DEBUG if self.frameOut.logEvents.get() else TRACE_SUMMARY
+
+	# Ask for the distribution parameters before the run starts, the worker thread never shows a popup
+	def askDistParams(self, MC, procDist):
+		if procDist == 'Custom':
+			popup = CustomDist(self)
+			self.wait_window(popup.top)
+			MC.customEquation = popup.stringEquation
+		elif procDist == 'Bounded Pareto':
+			popup = BoundedParetoDist(self)
+			self.wait_window(popup.top)
+			MC.BPArray = [float(param) for param in popup.paramArray]
+		MC.timesClicked = 1
+
+	# Run MC.run(*args) on a worker thread, which writes to the console buffer and posts its progress
+	def startRun(self, MC, I, *args):
+		MC.master = MC.Progress = WorkerConsole(self.consoleBuffer)
+		self.setLogEvents(None)
+		self.worker = SimulationThread(MC.run, args)
+		self.worker.start()
+		self.after(REFRESH_INTERVAL, self.pollProgress, MC, I)
+
+	# Show the progress of the run in the status bar until it ends, then its results
+	def pollProgress(self, MC, I):
+		for kind, value in MC.Progress.take():
+			self.updateStatusBar(value.describe() if kind == 'progress' else value)
+		if self.worker.is_alive():
+			self.after(REFRESH_INTERVAL, self.pollProgress, MC, I)
+		elif self.worker.error is not None:
+			print (self.worker.errorText)
+			self.writeToConsole("ERROR: %s"%self.worker.error)
+			self.updateStatusBar("Simulation failed.")
+		else:
+			self.finishRun(MC, I)
 
 	def submit(self, event):
+		if self.worker is not None and self.worker.is_alive():
+			self.updateStatusBar("A simulation is already running, stop it first.")
+			return
 		self.updateStatusBar("Simulating...")
 		#self.clearSavedJobs()
 		#self.clearSavedArrivals()
 		#self.clearSavedNumJobs()
 		I = Input(self)
 
-		# Set global variable for num servers to value inputed
-		global NUM_SERVERS
-		NUM_SERVERS = I.valuesList[0]
-
 		self.printParams(I.valuesList[0],					#num Servers
 						 I.valuesList[1],					#load
 						 #I.valuesList[2],					# arrival rate
@@ -251,11 +294,11 @@ class GUI(Tk):
 						 I.valuesList[5],					#error max 
 						 I.valuesList[6])					#sim time
 
-		main.timesClicked = 0
-		
-		# Start process
-		MC = MachineClass(self)
-		MC.run(	#I.valuesList[0],					#num Servers
+		# Start process on a worker thread, finishRun reports on it once it ends
+		MC = self.sim = MachineClass(self, I.valuesList[0], self.seed, self.rand)
+		self.askDistParams(MC, I.distList[1])
+		self.startRun(MC, I,
+				#I.valuesList[0],					#num Servers
 				I.valuesList[1],					#load
 				#I.valuesList[2],					# arrival rate
 				'Exponential',						# arrival
@@ -264,21 +307,26 @@ class GUI(Tk):
 				I.valuesList[5],					# error max
 				I.valuesList[6])					# sim time
 
+	# Results of a run that has ended, on the main thread
+	def finishRun(self, MC, I):
+		self.printResults(MC)
+
 		self.saveParams(I.valuesList[0],				#num Servers
 						I.valuesList[1],				#load
-						'?',							# arrival rate
+						None,							# arrival rate
 						'Exponential',					# arrival dist
-						'?', I.distList[1],				# processing
+						None, I.distList[1],			# processing
 						I.valuesList[4], 				# error min
 						I.valuesList[5],				# error max
 						I.valuesList[6],				# sim time
-						JobClass.BPArray[0],			# alpha
-						JobClass.BPArray[1],			# lower
-						JobClass.BPArray[2])			# upper
+						MC.BPArray[0],					# alpha
+						MC.BPArray[1],					# lower
+						MC.BPArray[2],					# upper
+						MC.seed, MC.AvgNumJobs, MC = MC)
 
 	
-		self.plotNumJobsInSys()
-		self.plotAvgNumJobsInSys()
+		self.plotNumJobsInSys(MC.NumJobsSeries)
+		self.plotAvgNumJobsInSys(MC.AvgNumJobsSeries)
 		self.updateStatusBar("Simulation complete.")
 
 
@@ -486,6 +534,16 @@ class Output(LabelFrame):
 		self.stopButton = Button(buttonFrame, text = "STOP SIMULATION", command = self.onStopButtonClick)
 		self.stopButton.grid(row = 2, column = 2)
 
+		# Log Button
+		self.logButton = Button(buttonFrame, text = "LOG TO FILE", command = self.onLogButtonClick)
+		self.logButton.grid(row = 2, column = 3)
+
+		# Log events checkbox, unchecked traces only the summary of a run to the console
+		self.logEvents = BooleanVar()
+		self.logEvents.set(True)
+		self.logEventsCheck = Checkbutton(buttonFrame, text = "LOG EVENTS", variable = self.logEvents, command = self.onLogEventsClick)
+		self.logEventsCheck.grid(row = 2, column = 4)
+
 	def onClearButtonClick(self):
 		# Clear console
 		self.clearButton.event_generate("<<output_clear>>")
@@ -498,6 +556,14 @@ class Output(LabelFrame):
 		# Stop simulation
 		self.stopButton.event_generate("<<stop_sim>>")
 
+	def onLogButtonClick(self):
+		# Log console to a file
+		self.logButton.event_generate("<<output_log>>")
+
+	def onLogEventsClick(self):
+		# Switch per-event console lines
+		self.logEventsCheck.event_generate("<<output_log_events>>")
+
 #----------------------------------------------------------------------#
 # Class: CustomDist
 #
@@ -576,13 +642,13 @@ class CustomDist(object):
 #
 #----------------------------------------------------------------------#
 class BoundedParetoDist(object):
-	Array = []
 	def __init__(self, master):
 		top = self.top = Toplevel(master)
 		top.geometry("500x200")                     # set window size
 		top.resizable(0,0)
 		
 		self.errorMessage = StringVar()
+		self.paramArray = []
 
 		self.alpha = DoubleVar()
 		self.L = DoubleVar()
@@ -629,7 +695,6 @@ class BoundedParetoDist(object):
 
 	def cleanup(self):
 		if(self.checkParams() == 0):
-			self.paramArray=BoundedParetoDist.Array
 			self.top.destroy()
 
 	def checkParams(self):
@@ -642,173 +707,101 @@ class BoundedParetoDist(object):
 			return 1
 		else:
 			self.errorMessage.set("")
-			BoundedParetoDist.Array = [self.a, self.l, self.u]
+			self.paramArray = [self.a, self.l, self.u]
 			return 0
 
 
-#----------------------------------------------------------------------#
-# Class: Node
-#
-# This class is used to define the linked list nodes.
-#
-#----------------------------------------------------------------------#
-class Node():
-	def __init__(self, job, nextNode = None):
-		self.job = job
-		self.nextNode = nextNode
-
-
-#----------------------------------------------------------------------#
-# Class: LinkedList
-#
-# This class is used to make the linked list data structure used to
-# store jobs.
-#
-#----------------------------------------------------------------------#
-class LinkedList(object):
-	Size = 0
-
-	def __init__(self, head = None):
-		self.head = head
-
-	# Insert job into queue (sorted by ERPT)
-	def insert(self, job):
-		current = self.head		# node iterator, starts at head
-		previous = None
-		if (current == None):	# if queue is empty, set current job as head
-			self.head = Node(job, None)
-		else:
-			while (current != None) and (job.ERPT > current.job.ERPT):
-				previous = current 				# prev = node[i]
-				current = current.nextNode 		# current = node[i+1]
-			
-			# Insert new node after previous before current
-			if (previous == None):
-				self.head = Node(job, current)
-			else:
-				previous.nextNode = Node(job, current)
-
-		LinkedList.Size += 1
-
-	# Remove first item in queue
-	def removeHead(self):
-		if (LinkedList.Size > 0):
-			self.head = self.head.nextNode		# move head forward one node
-			LinkedList.Size -= 1
-		else:
-			print ("ERROR: The linked list is already empty!!")
-
-	def clear(self):
-		self.head = None
-
-	def printList(self):
-		current = self.head
-		while (current != None):
-			print (current.job.name, current.job.ERPT)
-			current = current.nextNode
-
-
 #----------------------------------------------------------------------#
 # Class: JobClass
 #
 # This class is used to define jobs.
 #
-# Attributes: arrival time, processing time, remaining processing 
-# time, estimated remaining processing time, percent error
+# Attributes: id, processing time, remaining processing time,
+# estimated remaining processing time, arrival time. Jobs use
+# __slots__ and keep no reference to the GUI, so the millions made in a
+# run stay small. Rates and samplers are the same for every job in a run
+# and kept on the MachineClass (sim) running it.
 #----------------------------------------------------------------------#
 class JobClass(object):
-	BPArray = []
+	__slots__ = ('id', 'arrivalTime', 'completionTime', 'procTime', 'RPT', 'ERPT')
 
-	def __init__(self, master):
-		self.master = master
+	def __init__(self, jobID):
+		self.id = jobID
 		self.arrivalTime = 0
 		self.completionTime = 0
 		self.procTime = 0
 		self.RPT = 0		# Real Remaining Processing Time
 		self.ERPT = 0		# Estimated Remaining Processing Time
-		self.percentError = 0
-		self.processRate = 0
-		self.arrivalRate = 0
-		#JobClass.BPArray = []
 
-	def setArrProcRates(self, load, procRate, procDist):
+	@property
+	def name(self):
+		return "Job%02d"%self.id
+
+	# Work out the rates once for each (load, procRate, procDist), BPArray is fixed for a run
+	def setArrProcRates(self, sim, load, procRate, procDist):
+		if sim.RateParams == (load, procRate, procDist):
+			return
+		sim.RateParams = (load, procRate, procDist)
+		processRate = 0
 		if procDist == 'Bounded Pareto':
-			alpha = JobClass.BPArray[0]
-			L = JobClass.BPArray[1]
-			U = JobClass.BPArray[2]
+			alpha = sim.BPArray[0]
+			L = sim.BPArray[1]
+			U = sim.BPArray[2]
 			if alpha > 1 and L > 0:
 				procMean = (L**alpha/(1 - (L/U)**alpha))*(alpha/(alpha - 1))*((1/(L**(alpha - 1)))-(1/(U**(alpha - 1))))
-				self.processRate = 1/float(procMean)
-		else:
-			self.processRate = procRate
-		self.arrivalRate = float(load) * self.processRate
-
-	# Dictionary of service distributions
-	def setServiceDist(self, procRate, procDist):
-		ServiceDistributions =  {
-			'Poisson': random.expovariate(1.0/procRate),
-			'Exponential': random.expovariate(procRate),
-			'Uniform': random.uniform(0.0, procRate),
-			'Bounded Pareto': self.setBoundedPareto,
-			'Custom': self.setCustomDist
-		}
-		if(procDist == 'Custom'):
-			return ServiceDistributions[procDist](procRate)
-		elif(procDist == 'Bounded Pareto'):
-			return ServiceDistributions[procDist]()
+				processRate = 1/float(procMean)
 		else:
-			return ServiceDistributions[procDist]
-
-	def setCustomDist(self, procRate):
-		if main.timesClicked == 0:
-			main.timesClicked += 1
-			self.popup = CustomDist(self.master)
-			self.master.wait_window(self.popup.top)
-			main.customEquation = self.popup.stringEquation
-		return eval(main.customEquation)
-
-	def setBoundedPareto(self):
+			processRate = procRate
+		sim.processRate = processRate
+		sim.arrivalRate = float(load) * processRate
+
+	# Draw a service time, building the sampler for this run's distribution on first use
+	def setServiceDist(self, sim, procRate, procDist):
+		if sim.ServiceSampler is None:
+			if(procDist == 'Custom'):
+				self.setCustomDist(sim, procRate)
+			elif(procDist == 'Bounded Pareto'):
+				self.setBoundedPareto(sim)
+			sim.ServiceSampler = makeServiceSampler(procDist, procRate, sim.BPArray, sim.customEquation, makeGenerator(sim.rand), sim.rand)
+		return sim.ServiceSampler()
+
+	def setCustomDist(self, sim, procRate):
+		if sim.timesClicked == 0:
+			sim.timesClicked += 1
+			popup = CustomDist(sim.master)
+			sim.master.wait_window(popup.top)
+			sim.customEquation = popup.stringEquation
+
+	def setBoundedPareto(self, sim):
 		# Get and set parameters (in job class array)
-		if main.timesClicked == 0:
-			main.timesClicked += 1
-			self.popup = BoundedParetoDist(self.master)
-			self.master.wait_window(self.popup.top)		
-			self.alpha = float(self.popup.paramArray[0])	# Shape, power of tail, alpha = 2 is approx Expon., alpha = 1 gives higher variance
-			self.L = float(self.popup.paramArray[1])		# Smallest job size
-			self.U = float(self.popup.paramArray[2])		# Largest job size
-			JobClass.BPArray = [self.alpha, self.L, self.U]
-
-			
-		x = random.uniform(0.0, 1.0)
-		# reassigning 
-		alpha = JobClass.BPArray[0]
-		L = JobClass.BPArray[1]
-		U = JobClass.BPArray[2]
-
-		paretoNumerator = float(-(x*(U**alpha) - x*(L**alpha) - (U**alpha)))
-		paretoDenominator = float((U**alpha) * (L**alpha))
-		main.customEquation = (paretoNumerator/paretoDenominator)**(-1/alpha)
-		
-		return main.customEquation
+		if sim.timesClicked == 0:
+			sim.timesClicked += 1
+			popup = BoundedParetoDist(sim.master)
+			sim.master.wait_window(popup.top)		
+			alpha = float(popup.paramArray[0])	# Shape, power of tail, alpha = 2 is approx Expon., alpha = 1 gives higher variance
+			L = float(popup.paramArray[1])		# Smallest job size
+			U = float(popup.paramArray[2])		# Largest job size
+			sim.BPArray = [alpha, L, U]
 
 
 	# Generates a percent error for processing time
-	def generateError(self, percErrorMin, percErrorMax):
-		self.percentError = random.uniform(percErrorMin, percErrorMax)
-		return self.percentError
+	def generateError(self, sim, percErrorMin, percErrorMax):
+		if sim.ErrorParams != (percErrorMin, percErrorMax):
+			sim.ErrorParams = (percErrorMin, percErrorMax)
+			sim.ErrorSampler = makeErrorSampler(percErrorMin, percErrorMax, makeGenerator(sim.rand), sim.rand)
+		return sim.ErrorSampler()
 
 	# Sets all processing times for job
-	def setJobAttributes(self, load, procRate, procDist, percErrorMin, percErrorMax):
+	def setJobAttributes(self, sim, load, procRate, procDist, percErrorMin, percErrorMax):
 		if(procDist == 'Bounded Pareto'):
-			self.procTime = self.setServiceDist(procRate, procDist) 		#use updated proc rate
-			self.setArrProcRates(load, procRate, procDist)
+			self.procTime = self.setServiceDist(sim, procRate, procDist) 		#use updated proc rate
+			self.setArrProcRates(sim, load, procRate, procDist)
 		else:
-			self.setArrProcRates(load, procRate, procDist)
-			self.procTime = self.setServiceDist(procRate, procDist) 		#use updated proc rate
-		self.estimatedProcTime = (1 + (self.generateError(percErrorMin, percErrorMax)/100.0))*self.procTime
+			self.setArrProcRates(sim, load, procRate, procDist)
+			self.procTime = self.setServiceDist(sim, procRate, procDist) 		#use updated proc rate
 		self.RPT = self.procTime
-		self.ERPT = self.estimatedProcTime
-		self.arrivalTime = MachineClass.CurrentTime
+		self.ERPT = (1 + (self.generateError(sim, percErrorMin, percErrorMax)/100.0))*self.procTime	# estimated processing time
+		self.arrivalTime = sim.CurrentTime
 
 
 #----------------------------------------------------------------------#
@@ -820,240 +813,328 @@ class JobClass(object):
 # Events: job arrives, job completes
 # Activities: processing job, waiting for new job
 #
+# All state of a run is kept on the instance, so any number of runs can
+# be made one after another or side by side in one process. Each has its
+# own random stream: rand if given, else a new one seeded with seed.
+#
 #----------------------------------------------------------------------#
 class MachineClass(object):
-	Queue = LinkedList()
-	JobOrderOut = []
-	CurrentTime = 0.0
-	TimeUntilArrival = 0.0
-	
-	AvgNumJobs = 0
-	PrevTime = 0
-	PrevNumJobs = 0
-
-	StopSim = False
-	ServiceStartTimes = [None] * NUM_SERVERS	# Start times of job in each server
-	ProcessingJobs = [None] * NUM_SERVERS		# Array of current job in each server
-	ServersBusy = [False] * NUM_SERVERS			# Array of whether each server is busy
-
-	def __init__(self, master):
+	def __init__(self, master, numServers, seed = None, rand = None):
 		self.master = master
-		MachineClass.Queue.clear()
-		LinkedList.Size = 0
-		MachineClass.CurrentTime = 0.0
-		MachineClass.TimeUntilArrival = 0.0
-		MachineClass.StopSim = False	
-
-		MachineClass.ServiceStartTimes = [None] * NUM_SERVERS
-		MachineClass.ProcessingJobs = [None] * NUM_SERVERS
-		MachineClass.ServersBusy = [False] * NUM_SERVERS			
+		self.numServers = numServers
+		self.seed = seed
+		self.rand = rand if rand is not None else random.Random(seed)
+
+		self.Queue = HeapQueue()
+		self.CurrentTime = 0.0
+		self.TimeUntilArrival = 0.0
+		self.ArrivalSampler = None
+		self.ArrivalParams = None	# (arrRate, arrDist) the sampler was built for
+		self.StopSim = False
+		self.Progress = None		# WorkerConsole posting snapshots to the GUI, when run on a worker thread (see Progress.py)
+		self.Trace = EventTrace(TRACE_FORMATS)	# console trace of the run, debug level unless set (see EventTrace.py)
+
+		# Distribution parameters, asked for in popups on first use unless set before the run
+		self.timesClicked = 0
+		self.customEquation = ""
+		self.BPArray = []
+
+		# Rates and samplers shared by all jobs of the run (see JobClass)
+		self.RateParams = None		# (load, procRate, procDist) the rates were worked out for
+		self.processRate = 0
+		self.arrivalRate = 0
+		self.ServiceSampler = None	# built on first use
+		self.ErrorSampler = None
+		self.ErrorParams = None		# (percErrorMin, percErrorMax) the error sampler was built for
+
+		self.ServiceStartTimes = [None] * numServers	# Start times of job in each server
+		self.ProcessingJobs = [None] * numServers		# Array of current job in each server
+		self.ServersBusy = [False] * numServers			# Array of whether each server is busy
+		self.Calendar = ServerCalendar(numServers)		# Completion times of busy servers
 		
-		MachineClass.AvgNumJobs = 0
-		MachineClass.PrevTime = 0
-		MachineClass.PrevNumJobs = 0
-
-		NumJobs[:] = []
-		AvgNumJobs[:] = []
-		NumJobsTime[:] = []
+		self.NumJobsBatches = WarmupBatches()		# batch means of the number of jobs, for its warm-up period and confidence interval
+		self.NumJobsStats = TimeAverage(batches = self.NumJobsBatches)		# number of jobs in the system over time
+		self.ResponseTimes = WarmupBatches()		# batch means of the response times of completed jobs
+		self.Confidence = 0.95
+		self.Warmup = False		# leave the warm-up period found by MSER-5 out of the results
+		self.NumJobsSeries = SeriesRecorder(maxPoints = 10000, mode = 'bucket')		# plot series, bounded memory (see TimeSeries.py)
+		self.AvgNumJobsSeries = SeriesRecorder(maxPoints = 10000, mode = 'bucket')
 
 		self.ctr = 0
-
-	# Dictionary of arrival distributions
+		self.numJobsFile = None
+		self.avgNumJobsFile = None
+		self.traceFile = None
+		self.RunKey = None		# in the names of this run's result files (see ResultsFiles.runKey)
+
+	# Time-average number of jobs in the system up to the last event, after the warm-up period if it is left out
+	@property
+	def AvgNumJobs(self):
+		if self.Warmup:
+			return self.NumJobsBatches.steady().mean()
+		return self.NumJobsStats.mean()
+
+	# Length of the warm-up period left out of the results, 0 unless run with warmup
+	def warmupTime(self):
+		if self.Warmup:
+			return self.NumJobsBatches.truncation()
+		return 0.0
+
+	# Keep a trace record and write its line to the console if anyone reads it, called only once its level is known to be on
+	def trace(self, record):
+		self.Trace.record(record)
+		if self.Trace.output:
+			self.master.writeToConsole(self.Trace.format(record))
+
+	# Results of the run with their confidence intervals, one line each
+	def results(self):
+		return ["Simulated Time = %.4f%s"%(self.CurrentTime, " (precision reached)" if self.NumJobsBatches.converged else ""),
+				"Warm-up Period = %.4f (MSER-5, %s)"%(self.NumJobsBatches.truncation(), "left out" if self.Warmup else "included"),
+				"Average Number of Jobs = %s"%self.NumJobsBatches.estimate().describe(self.Confidence),
+				"Average Response Time = %s"%self.ResponseTimes.estimate().describe(self.Confidence)]
+
+	# Draw an interarrival time, rebuilding the sampler when the rate or distribution changes
 	def setArrivalDist(self, arrRate, arrDist):
-		ArrivalDistributions = {
-			'Poisson': random.expovariate(1.0/arrRate),
-			'Exponential': random.expovariate(arrRate)
-			#'Normal': Rnd.normalvariate(self.inputInstance.valuesList[0])
-			#'Custom':
-		}
-		return ArrivalDistributions[arrDist]
+		if self.ArrivalParams != (arrRate, arrDist):
+			self.ArrivalParams = (arrRate, arrDist)
+			self.ArrivalSampler = makeArrivalSampler(arrDist, arrRate, makeGenerator(self.rand), self.rand)
+		return self.ArrivalSampler()
 	
-	#update data
-	def updateJobs(self):
-		for serverID in range(NUM_SERVERS):
-			if(MachineClass.ProcessingJobs[serverID] != None):
-				serviceTime = MachineClass.CurrentTime - MachineClass.ServiceStartTimes[serverID]
-				MachineClass.ProcessingJobs[serverID].RPT -= serviceTime
-				MachineClass.ProcessingJobs[serverID].ERPT -= serviceTime
-				MachineClass.ServiceStartTimes[serverID] = MachineClass.CurrentTime
-
-	def calcNumJobs(self, jobID, load):
-		self.currentNumJobs = 0
-
-		# First add all jobs that are currently being processed
-		for serverID in range(NUM_SERVERS):
-			if(MachineClass.ServersBusy[serverID] == True):
-				self.currentNumJobs += 1
-
-		# Secondly, add all jobs that are waiting in queue
-		self.currentNumJobs += MachineClass.Queue.Size
-		
-
-		#changeInJobs = MachineClass.PrevNumJobs - self.currentNumJobs
-		self.t = MachineClass.CurrentTime
-		self.delta_t = self.t - MachineClass.PrevTime 
-
-		# If one job in system
-		if(jobID == 0):
-			MachineClass.AvgNumJobs = 1 # First event is always create new job
-		# UPDATE 
+	# Update remaining times of the job processing on serverID. A processing job keeps the RPT/ERPT
+	# it started with, so this is only done when it stops or its remaining time is needed.
+	def updateJob(self, serverID):
+		job = self.ProcessingJobs[serverID]
+		serviceTime = self.CurrentTime - self.ServiceStartTimes[serverID]
+		job.RPT -= serviceTime
+		job.ERPT -= serviceTime
+		self.ServiceStartTimes[serverID] = self.CurrentTime
+
+	def calcNumJobs(self, load):
+		# Jobs that are currently being processed, plus all jobs that are waiting in queue. Counted
+		# before the event changes them, so this is the number of jobs since the previous event.
+		self.currentNumJobs = self.Calendar.NumBusy + self.Queue.Size
+		self.NumJobsStats.add(self.CurrentTime, self.currentNumJobs)
+
+		# The running average is only worked out where it is written: once per plot bucket, and per row of the text files
+		self.NumJobsSeries.append(self.CurrentTime, self.currentNumJobs)
+		if self.AvgNumJobsSeries.startsBucket(self.CurrentTime):
+			self.AvgNumJobsSeries.append(self.CurrentTime, self.NumJobsStats.mean())
+		if self.traceFile is not None:
+			self.traceFile.append(self.CurrentTime, self.currentNumJobs)		# the trace averages a chunk at a time
 		else:
-			MachineClass.AvgNumJobs = (MachineClass.PrevTime/(self.t))*float(MachineClass.AvgNumJobs) + float(MachineClass.PrevNumJobs)*(float(self.delta_t)/self.t)
-			
-		# PrevTime becomes "old" t
-		MachineClass.PrevTime = self.t 
-		# PrevNum jobs becomes current num jobs
-		MachineClass.PrevNumJobs = self.currentNumJobs
+			self.saveNumJobs(load, self.CurrentTime, self.currentNumJobs)
+			self.saveAvgNumJobs(load, self.CurrentTime, self.NumJobsStats.mean())
 
-		#GUI.writeToConsole(self.master, "%.6f | %.6f average num jobs %s"%(MachineClass.CurrentTime, self.t, MachineClass.AvgNumJobs))
-		NumJobs.append(self.currentNumJobs)					# y axis of plot
-		AvgNumJobs.append(MachineClass.AvgNumJobs)			# y axis of plot
-		NumJobsTime.append(MachineClass.CurrentTime)		# x axis of plot
-		self.saveNumJobs(load, MachineClass.CurrentTime, self.currentNumJobs)
-		self.saveAvgNumJobs(load, MachineClass.CurrentTime, MachineClass.AvgNumJobs)
 
+	# Open the result files once per run, after the first job has set the distribution parameters
+	def openResultsFiles(self, load):
+		scaledLoad = int(load * 100)
+		self.RunKey = runKey(self.seed)
+		numPath = "./MULTI_SERVER_RESULTS/SRPT/SRPT_Num_load=%s_alpha=%s_servers=%s_%s.txt"%(scaledLoad, self.BPArray[0], self.numServers, self.RunKey)
+		avgPath = "./MULTI_SERVER_RESULTS/SRPT/SRPT_Avg_load=%s_alpha=%s_servers=%s_%s.txt"%(scaledLoad, self.BPArray[0], self.numServers, self.RunKey)
+		if self.traceFormat == 'binary':
+			# Directory of .npy chunks for this run, next to where the text files would go
+			self.traceFile = TraceWriter(numPath.replace("_Num_", "_Trace_")[:-len(".txt")])
+		else:
+			self.numJobsFile = ResultsWriter(numPath, self.flushInterval)
+			self.avgNumJobsFile = ResultsWriter(avgPath, self.flushInterval)
+
+	# Write out anything still buffered, called when the run ends for any reason
+	def closeResultsFiles(self):
+		if self.numJobsFile is not None:
+			self.numJobsFile.close()
+		if self.avgNumJobsFile is not None:
+			self.avgNumJobsFile.close()
+		if self.traceFile is not None:
+			self.traceFile.close()
 
 	def saveNumJobs(self, load, numJobs, time):
-		text = "%f,%f"%(numJobs, time) + "\n"
-		scaledLoad = int(load * 100)
-		path = "./MULTI_SERVER_RESULTS/SRPT/SRPT_Num_load=%s_alpha=%s_servers=%s.txt"%(scaledLoad, JobClass.BPArray[0], NUM_SERVERS)
-		
-		with open(path, "a") as myFile:
-			myFile.write(text)
-		myFile.close()				
+		self.numJobsFile.write("%f,%f\n"%(numJobs, time))
 
 	def saveAvgNumJobs(self, load, avgNumJobs, time):
-		text = "%f,%f"%(avgNumJobs, time) + "\n"
-		scaledLoad = int(load * 100)
-		path = "./MULTI_SERVER_RESULTS/SRPT/SRPT_Avg_load=%s_alpha=%s_servers=%s.txt"%(scaledLoad, JobClass.BPArray[0], NUM_SERVERS)
-
-		with open(path, "a") as myFile:
-			myFile.write(text)
-		myFile.close()	
+		self.avgNumJobsFile.write("%f,%f\n"%(avgNumJobs, time))
 
 
 	# Job arriving
 	def arrivalEvent(self, load, arrDist, procRate, procDist, percErrorMin, percErrorMax):
-		J = JobClass(self.master)
-		J.setJobAttributes(load, procRate, procDist, percErrorMin, percErrorMax)
-		J.name = "Job%02d"%self.ctr
+		J = JobClass(self.ctr)
+		J.setJobAttributes(self, load, procRate, procDist, percErrorMin, percErrorMax)
+
+		if (self.ctr == 0):
+			self.openResultsFiles(load)
 
-		self.calcNumJobs(self.ctr, load)
+		self.calcNumJobs(load)
 
-		GUI.writeToConsole(self.master, "%.6f | %s arrived, ERPT = %.5f"%(MachineClass.CurrentTime, J.name, J.ERPT))	
+		if self.Trace.level >= TRACE_EVENT:
+			self.trace(('arrival', self.CurrentTime, J.name, J.ERPT))
 
-		self.updateJobs()				# update all processing jobs
-		MachineClass.Queue.insert(J)	# add job to queue
+		self.Queue.insert(J)	# add job to queue
 
-		# Find longest RPT of all processing jobs, preempt longest processing job
-		try:				
-			maxERPT = max(element.ERPT for element in MachineClass.ProcessingJobs if element is not None)
-			l = [x for x in MachineClass.ProcessingJobs if (x is not None and x.ERPT == maxERPT)]
-			maxProcJob = l[0]
+		# Find longest ERPT of all processing jobs, preempt longest processing job
+		latest = self.Calendar.latestEstimate()
+		if latest is not None:
+			maxERPT = latest[0] - self.CurrentTime
+			serverID = latest[1]
+			maxProcJob = self.ProcessingJobs[serverID]
 
 			# Preempt largest job processing if all servers busy
-			if (maxERPT > J.ERPT)and(all(element == True for element in MachineClass.ServersBusy)):
-				#GUI.writeToConsole(self.master, "%.6f | %s preempting %s"%(MachineClass.CurrentTime, J.name, maxProcJob.name))
-				GUI.writeToConsole(self.master, "----------- | %s preempting %s"%(J.name, maxProcJob.name))
+			if (maxERPT > J.ERPT)and(self.Calendar.NumBusy == self.numServers):
+				if self.Trace.level >= TRACE_DEBUG:
+					self.trace(('preempt', self.CurrentTime, J.name, maxProcJob.name))
 				#Remove maxProcJob from server
-				serverID = MachineClass.ProcessingJobs.index(maxProcJob)
-				MachineClass.ServersBusy[serverID] = False
-				MachineClass.ProcessingJobs[serverID] = None
-				MachineClass.ServiceStartTimes[serverID] = None
+				self.updateJob(serverID)
+				self.Calendar.stop(serverID)
+				self.ServersBusy[serverID] = False
+				self.ProcessingJobs[serverID] = None
+				self.ServiceStartTimes[serverID] = None
 
 				#add back to queue
-				MachineClass.Queue.insert(maxProcJob)	# add job to queue
-				#GUI.writeToConsole(self.master, "%.6f | %s added back to queue, ERPT = %.5f"%(MachineClass.CurrentTime, maxProcJob.name, maxProcJob.ERPT))
-				GUI.writeToConsole(self.master, "----------- | %s added back to queue, ERPT = %.5f"%(maxProcJob.name, maxProcJob.ERPT))
-
-		except ValueError:
-			maxERPT = 10^100
-			maxProcJob = None			
+				self.Queue.insert(maxProcJob)	# add job to queue
+				if self.Trace.level >= TRACE_DEBUG:
+					self.trace(('requeue', self.CurrentTime, maxProcJob.name, maxProcJob.ERPT))
 
 
 		self.processJobs()				# process first job in queue	
 
 		# Generate next arrival
-		MachineClass.TimeUntilArrival = self.setArrivalDist(J.arrivalRate, arrDist)
+		self.TimeUntilArrival = self.setArrivalDist(self.arrivalRate, arrDist)
 		self.ctr += 1
 
 	# Processing first job in queue
 	def processJobs(self):
-		for serverID in range(NUM_SERVERS):
-			#Server not busy and queue is not empty
-			if (MachineClass.ServersBusy[serverID] == False) and (MachineClass.Queue.Size > 0):
-				currentJob = MachineClass.Queue.head.job
-
-				MachineClass.ServiceStartTimes[serverID] = MachineClass.CurrentTime
-				MachineClass.ProcessingJobs[serverID] = currentJob
-				MachineClass.ServersBusy[serverID] = True
-				#GUI.writeToConsole(self.master, "%.6f | %s processing on server %s"%(MachineClass.CurrentTime, currentJob.name, index))
-				GUI.writeToConsole(self.master, "----------- | %s processing on server %s, ERPT=%s"%(currentJob.name, serverID, currentJob.ERPT))
-				MachineClass.Queue.removeHead()	# remove first job from queue
+		#Lowest numbered server not busy, while queue is not empty
+		while (self.Calendar.NumBusy < self.numServers) and (self.Queue.Size > 0):
+			serverID = self.Calendar.firstIdle()
+			currentJob = self.Queue.getHead()
+
+			self.ServiceStartTimes[serverID] = self.CurrentTime
+			self.ProcessingJobs[serverID] = currentJob
+			self.ServersBusy[serverID] = True
+			self.Calendar.start(serverID, self.CurrentTime + currentJob.RPT, self.CurrentTime + currentJob.ERPT)
+			if self.Trace.level >= TRACE_DEBUG:
+				self.trace(('start', self.CurrentTime, currentJob.name, serverID, currentJob.ERPT))
+			self.Queue.removeHead()	# remove first job from queue
 
 	# Job completed
-	def completionEvent(self, completingJob, load, percErrorMin, percErrorMax):
-		completingJob.completionTime = MachineClass.CurrentTime
-		self.calcNumJobs(self.ctr, load)
+	def completionEvent(self, completingJob, serverID, load, percErrorMin, percErrorMax):
+		completingJob.completionTime = self.CurrentTime
+		self.ResponseTimes.add(self.CurrentTime - completingJob.arrivalTime)
+		self.calcNumJobs(load)
 
 		# Server no longer busy
-		serverID = MachineClass.ProcessingJobs.index(completingJob)
-		MachineClass.ServersBusy[serverID] = False
-		MachineClass.ProcessingJobs[serverID] = None
-		MachineClass.ServiceStartTimes[serverID] = None
+		self.updateJob(serverID)
+		self.Calendar.stop(serverID)
+		self.ServersBusy[serverID] = False
+		self.ProcessingJobs[serverID] = None
+		self.ServiceStartTimes[serverID] = None
 
-		GUI.writeToConsole(self.master, "%.6f | %s COMPLTED at server %s"%(MachineClass.CurrentTime, completingJob.name, serverID))
-
-		#Update other processing jobs (in case next event should be completion)
-		self.updateJobs()
+		if self.Trace.level >= TRACE_EVENT:
+			self.trace(('completion', self.CurrentTime, completingJob.name, serverID))
 
 		#If there is a job waiting for this server, process it
-		if(MachineClass.Queue.Size > 0):
+		if(self.Queue.Size > 0):
 			self.processJobs()
 
 
-	def run(self, load, arrDist, procRate, procDist, percErrorMin, percErrorMax, simLength):
+	def run(self, load, arrDist, procRate, procDist, percErrorMin, percErrorMax, simLength, flushInterval = 10000, traceFormat = 'text', precision = None, confidence = 0.95, warmup = False):
+		self.NumJobsBatches.setPrecision(precision, confidence)	# None runs to simLength
+		self.Confidence = confidence
+		self.Warmup = self.NumJobsBatches.truncate = self.ResponseTimes.truncate = warmup
 		counter = 1;
-		while 1:
-			# Generate time of first job arrival
-			if(self.ctr == 0):
-				arrRate = float(load) / procRate
-				MachineClass.TimeUntilArrival = self.setArrivalDist(arrRate, arrDist) # generate next arrival
-
-			# Find shortest RPT of all processing jobs		
-			try:
-				minRPT = min(element.RPT for element in MachineClass.ProcessingJobs if element is not None)
-				l = [x for x in MachineClass.ProcessingJobs if (x is not None and x.RPT == minRPT)]
-				minProcJob = l[0]
-			except ValueError:
-				minRPT = -1	
-				minProcJob = None
-
-			# If all servers are idle, or next arrival is before completion of shortest job processing next event is ARRIVAL
-			if (all(element == False for element in MachineClass.ServersBusy)) or (MachineClass.TimeUntilArrival < minRPT):
-				MachineClass.CurrentTime += MachineClass.TimeUntilArrival
-				self.arrivalEvent(load, arrDist, procRate, procDist, percErrorMin, percErrorMax)
+		self.flushInterval = flushInterval
+		self.traceFormat = traceFormat	# 'text' or 'binary' (see ResultsFiles.py)
+		try:
+			while 1:
+				# Generate time of first job arrival
+				if(self.ctr == 0):
+					arrRate = float(load) / procRate
+					self.TimeUntilArrival = self.setArrivalDist(arrRate, arrDist) # generate next arrival
+
+				# Find next completion (job with shortest RPT)
+				nextCompletion = self.Calendar.nextCompletion()
+
+				# If all servers are idle, or next arrival is before completion of shortest job processing next event is ARRIVAL
+				if (nextCompletion is None) or (self.TimeUntilArrival < nextCompletion[0] - self.CurrentTime):
+					self.CurrentTime += self.TimeUntilArrival
+					self.arrivalEvent(load, arrDist, procRate, procDist, percErrorMin, percErrorMax)
 			
-			#next event is job finishing (job with shortest RPT)			
-			else:
-				completingJob = minProcJob
-				MachineClass.CurrentTime += completingJob.RPT
-				self.completionEvent(completingJob, load, percErrorMin, percErrorMax)
+				#next event is job finishing (job with shortest RPT)			
+				else:
+					completionTime, serverID = nextCompletion
+					completingJob = self.ProcessingJobs[serverID]
+					self.CurrentTime = completionTime
+					self.completionEvent(completingJob, serverID, load, percErrorMin, percErrorMax)
+
+				if self.Progress is not None:
+					self.Progress.tick(self)
 
-			# If current time is greater than the simulation length, end program
-			if (MachineClass.CurrentTime > simLength) or (MachineClass.StopSim == True):
-				break
+				# End once past the simulation length, stopped, or the average number of jobs is precise enough
+				if (self.CurrentTime > simLength) or (self.StopSim == True) or self.NumJobsBatches.converged:
+					if self.Trace.level >= TRACE_SUMMARY:
+						self.trace(('end', self.CurrentTime, self.ctr))
+					break
+		finally:
+			self.closeResultsFiles()
+
+
+#----------------------------------------------------------------------#
+# Runs one simulation without the GUI, the same way GUI.submit does.
+# Returns the time-average number of jobs in the system, or the
+# MachineClass that ran if returnMachine is set. Nothing is shared
+# between calls, so runs can be made from several threads at once.
+# The console is traced at traceLevel, by default debug when there is
+# a log file to write it to or records to keep (keepTrace), and off
+# otherwise. Records are only formatted into lines for a log file.
+#----------------------------------------------------------------------#
+def runHeadless(numServers, load, procRate, procDist, percErrorMin, percErrorMax, simLength,
+				alpha = 1.5, lower = 1.0, upper = 10**6, customEquation = "", seed = None, logFile = None, saveResults = True, flushInterval = 10000, traceFormat = 'text',
+				precision = None, confidence = 0.95, warmup = False, traceLevel = None, keepTrace = 0, returnMachine = False):
+	console = HeadlessConsole(logFile)
+	MC = MachineClass(console, numServers, seed if seed is not None else 994863731)
+
+	# Distribution parameters are given up front, so never show the popups
+	MC.timesClicked = 1
+	MC.customEquation = customEquation
+	MC.BPArray = [alpha, lower, upper]
+	if traceLevel is None:
+		traceLevel = TRACE_DEBUG if logFile or keepTrace else TRACE_OFF
+	MC.Trace = EventTrace(TRACE_FORMATS, traceLevel, keepTrace, output = bool(logFile))
+
+	try:
+		MC.run(	load,							# load
+				'Exponential',					# arrival
+				procRate, procDist,				# processing
+				percErrorMin,					# error min
+				percErrorMax,					# error max
+				simLength,						# sim time
+				flushInterval = flushInterval,
+				traceFormat = traceFormat,
+				precision = precision,
+				confidence = confidence,
+				warmup = warmup)
+		GUI.printResults(console, MC)
+	finally:
+		console.close()
+
+	if saveResults:
+		GUI.saveParams(console, numServers, load, None, 'Exponential', None, procDist, percErrorMin, percErrorMax, simLength, alpha, lower, upper, MC.seed, MC.AvgNumJobs, MC = MC)
+
+	if returnMachine:
+		return MC
+	return MC.AvgNumJobs
 
 
 #----------------------------------------------------------------------#
 def main():
+	# Run without the GUI if asked to on the command line
+	if '--headless' in sys.argv:
+		MC = runHeadless(returnMachine = True, **parseArgs('Multi-Server SRPT with Errors', load = 0.70, alpha = 1.5, resultsFiles = True))
+		for line in MC.results():
+			print (line)
+		return
+
 	window = GUI(None)                              # instantiate the class with no parent (None)
 	window.title('Multi-Server SRPT with Errors')  # title the window
 
-	# Global variables used in JobClass
-	main.timesClicked = 0       
-	main.customEquation = ""
-
 	#window.geometry("500x600")                     # set window size
 	window.mainloop()                               # loop indefinitely, wait for events
 
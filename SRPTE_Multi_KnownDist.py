@@ -10,28 +10,43 @@
 # Rachel Mailach
 #----------------------------------------------------------------------#
 
-from tkinter import *
-#from tkinter import messagebox
-from tkinter import ttk 
-from tkinter import filedialog
+try:
+	from tkinter import *
+	#from tkinter import messagebox
+	from tkinter import ttk 
+	from tkinter import filedialog
+except ImportError:		# no Tk on display-less compute nodes, only runHeadless() is usable
+	Tk = LabelFrame = object
 from datetime import datetime
 from math import log
 
-import plotly.plotly as py
-from plotly.graph_objs import Scatter
-import plotly.graph_objs as go
 from itertools import cycle
 
 import random
-import sqlite3
-import pandas
-import sympy
-import numpy
-
-conn=sqlite3.connect('MultiServerDatabase_SRPTE_KnownDist.db')
-
-NumJobs = []
-NumJobsTime = []
+import sys
+
+from Headless import HeadlessConsole, parseArgs
+from ConsoleBuffer import ConsoleBuffer, REFRESH_INTERVAL
+from EventTrace import EventTrace, TRACE_OFF, TRACE_SUMMARY, TRACE_EVENT, TRACE_DEBUG
+from Progress import WorkerConsole, SimulationThread
+from ResultsStore import sharedStore, summarize, RESULTS_DB
+from Plots import plotSeries, writeFigure, barFigure
+from TimeSeries import SeriesRecorder, TimeAverage
+from BatchMeans import WarmupBatches
+from Samplers import makeGenerator, makeServiceSampler, makeArrivalSampler, makeErrorSampler, workThreshold
+from JobQueues import ClassQueue, ServerCalendar
+
+VARIANT = 'SRPTE_Multi_KnownDist'		# name of the runs of this script in the results database (see ResultsStore.py)
+
+# Console lines of the trace records, by kind (see EventTrace.py)
+TRACE_FORMATS = {
+	'arrival':		"%.6f | %s arrived, class = %s, server = %s, erpt=%.6f",
+	'preempt':		"%.6f | %s preempting %s",
+	'start':		"%.6f | %s processing on server %s",
+	'completion':	"%.6f | %s COMPLTED at server %s",
+	'threshold':	"%.6f | Class threshold = %s",
+	'end':			"%.6f | run ended after %s arrivals",
+}
 
 #----------------------------------------------------------------------#
 # Class: GUI
@@ -44,10 +59,11 @@ class GUI(Tk):
 		Tk.__init__(self, master)
 		self.master = master        # reference to parent
 		self.statusText = StringVar()
-		global SEED
-		#SEED = random.randint(0, 1000000000)
-		SEED = 994863731
-		random.seed(SEED)
+		#self.seed = random.randint(0, 1000000000)
+		self.seed = 994863731
+		self.rand = random.Random(self.seed)	# one stream for all runs from this window
+		self.sim = None							# MachineClass of the current run
+		self.worker = None						# SimulationThread running it
 
 		# Create the input frame
 		self.frameIn = Input(self)
@@ -66,6 +82,12 @@ class GUI(Tk):
 		# Bind clear button
 		self.bind("<<output_clear>>", self.clearConsole)
 
+		# Bind log button
+		self.bind("<<output_log>>", self.openLog)
+
+		# Bind log events checkbox
+		self.bind("<<output_log_events>>", self.setLogEvents)
+
 		# Bind stop button
 		self.bind("<<stop_sim>>", self.stopSimulation)		
 
@@ -76,9 +98,11 @@ class GUI(Tk):
 		# Initialize console
 		self.consoleFrame = Frame(self.frameOut)
 		self.console = Text(self.consoleFrame, wrap = WORD)		
+		self.consoleBuffer = ConsoleBuffer()	# last lines written, painted into the console on a timer
 		self.makeConsole()
 		self.printIntro()
 		self.updateStatusBar("Waiting for submit...")
+		self.after(REFRESH_INTERVAL, self.refreshConsole)
 
 	def makeConsole(self):
 		#self.consoleFrame = Frame(self.frameOut)
@@ -96,12 +120,30 @@ class GUI(Tk):
 		self.grid_rowconfigure(0, weight=1)
 
 
+	# Lines only go to the buffer, refreshConsole paints them from the main loop
 	def writeToConsole(self, text = ' '):
-		self.console.config(state=NORMAL)       # make console editable
-		self.console.insert(END, '%s\n'%text)
-		self.update()
-		self.console.yview(END)					# auto-scroll		
-		self.console.config(state=DISABLED)     # disable (non-editable) console
+		self.consoleBuffer.write(text)
+
+	# Paint the lines written since the last repaint, keeping the console to the buffer's length
+	def refreshConsole(self):
+		lines = self.consoleBuffer.takePending()
+		if lines:
+			self.console.config(state=NORMAL)       # make console editable
+			self.console.insert(END, '%s\n'%'\n'.join(lines))
+			extra = int(self.console.index('end-1c').split('.')[0]) - 1 - self.consoleBuffer.maxLines
+			if extra > 0:
+				self.console.delete('1.0', '%d.0'%(extra + 1))
+			self.console.yview(END)					# auto-scroll
+			self.console.config(state=DISABLED)     # disable (non-editable) console
+			self.consoleBuffer.flushLog()
+		self.after(REFRESH_INTERVAL, self.refreshConsole)
+
+	# Write every console line from now on to a file, the console itself only keeps the last ones
+	def openLog(self, event):
+		filename = filedialog.asksaveasfilename(title="Log console to...", defaultextension='.txt')
+		if filename:
+			self.consoleBuffer.openLog(filename)
+			self.updateStatusBar("Logging console to %s"%filename)
 
 	def saveData(self, event):
 		# Get filename
@@ -124,6 +166,7 @@ class GUI(Tk):
 		myFile.close()
 
 	def clearConsole(self, event):
+		self.consoleBuffer.clear()
 		self.console.config(state=NORMAL)       # make console editable
 		self.console.delete('1.0', END)
 		self.console.config(state=DISABLED)     # disable (non-editable) console
@@ -134,10 +177,16 @@ class GUI(Tk):
 	def printIntro(self):
 		self.writeToConsole("Approximate SRPTE \n\n This application simulates a single server with Poisson arrivals and processing times of a general distribution. There are errors in time estimates within a range. Arrivals are assigned to SRPT classes using the methods described in Adaptive and Scalable Comparison Scheduling.")
 
-	def printParams(self, load, arrDist, procRate, procDist, percErrorMin, percErrorMax, numClasses, simLength): 
+	def printResults(self, MC):
+		self.writeToConsole("--------------------------------------------------------------------------------")
+		self.writeToConsole("RESULTS:")
+		for line in MC.results():
+			self.writeToConsole(line)
+
+	def printParams(self, numServers, load, arrDist, procRate, procDist, percErrorMin, percErrorMax, numClasses, simLength): 
 		self.writeToConsole("--------------------------------------------------------------------------------")
 		self.writeToConsole("PARAMETERS:")
-		self.writeToConsole("Number of Servers = %s"%NUM_SERVERS)
+		self.writeToConsole("Number of Servers = %s"%numServers)
 		self.writeToConsole("Load = %.4f"%load)
 		#self.writeToConsole("Arrival Rate = %.4f"%arrRate)
 		self.writeToConsole("Arrival Distribution = %s"%arrDist)
@@ -146,81 +195,37 @@ class GUI(Tk):
 		self.writeToConsole("Number of Classes = %d"%numClasses)
 		self.writeToConsole("Simulation Length = %.4f\n\n"%simLength)
 
-	def saveParams(self, load, arrRate, arrDist, procRate, procDist, percErrorMin, percErrorMax, numClasses, simLength, alpha, lower, upper):
-		params = pandas.DataFrame({	'seed' : [int(SEED)],
-									'numServers' : [int(NUM_SERVERS)],
-									'load' : [float(load)],
-									'arrRate' : [float(arrRate)],
-									'arrDist' : [str(arrDist)],
-									'procRate' : [float(procRate)],
-									'procDist' : [str(procDist)],
-									'alpha' : [float(alpha)],
-									'lower' : [float(lower)],
-									'upper' : [float(upper)],
-									'percErrorMin' : [float(percErrorMin)],
-									'percErrorMax' : [float(percErrorMax)],
-									'numClasses' : [int(numClasses)],
-									'simLength' : [float(simLength)],
-									'avgNumJobs' : [float(MachineClass.AvgNumJobs)],
-									'threshold' : [float(MachineClass.Threshold)]
-									})
-
-		params.to_sql(name='parameters', con=conn, if_exists='append')
-		print (params)
-
-	def plotNumJobsInSys(self, numClasses):
-		py.sign_in('mailacrs','wowbsbc0qo')
-		trace0 = Scatter(x=numpy.array(NumJobsTime, dtype=numpy.float64), y=numpy.array(NumJobs, dtype=numpy.float64))
-		data = [trace0]
-		layout = go.Layout(
-			title='Average Number of Jobs Over Time',
-			xaxis=dict(
-				title='Time',
-				titlefont=dict(
-				family='Courier New, monospace',
-				size=18,
-				color='#7f7f7f'
-			)
-		),
-			yaxis=dict(
-				title='Number of Jobs',
-				titlefont=dict(
-				family='Courier New, monospace',
-				size=18,
-				color='#7f7f7f'
-			)
-		)
-		)
-		fig = go.Figure(data=data, layout=layout)
-		unique_url = py.plot(fig, filename = 'SRPT_NumJobsInSys')
-
-		#-----------------------------------------------------------------------------#
+	def saveParams(self, numServers, load, arrRate, arrDist, procRate, procDist, percErrorMin, percErrorMax, numClasses, simLength, alpha, lower, upper, seed, avgNumJobs, threshold, MC = None):
+		record = {	'variant' : VARIANT,
+					'seed' : int(seed),
+					'servers' : int(numServers),
+					'load' : float(load),
+					'arrRate' : arrRate,
+					'arrDist' : str(arrDist),
+					'procRate' : procRate,
+					'procDist' : str(procDist),
+					'alpha' : float(alpha),
+					'lower' : float(lower),
+					'upper' : float(upper),
+					'percErrorMin' : float(percErrorMin),
+					'percErrorMax' : float(percErrorMax),
+					'numClasses' : int(numClasses),
+					'simLength' : float(simLength),
+					'avgNumJobs' : float(avgNumJobs),
+					'threshold' : float(threshold)}
+		if MC is not None:		# the run's summary statistics and per-class metrics, beside its parameters
+			record.update(summarize(MC))
+			record.update(precision = MC.NumJobsBatches.precision, confidence = MC.Confidence, warmup = MC.Warmup)
+		runId = sharedStore().addRun(record)
+		print ("Run %d saved to %s"%(runId, RESULTS_DB))
+
+	def plotNumJobsInSys(self, series, numJobsClass, numClasses):
+		path = plotSeries(series, 'Average Number of Jobs Over Time', 'SRPT_NumJobsInSys')
+		self.writeToConsole("Plot written to %s"%path)
+
 		# Average jobs/class
-		trace1 = go.Bar(y=numpy.array(MachineClass.NumJobsClass, dtype=numpy.float64))
-		
-		data1 = [trace1]
-		layout1 = go.Layout(
-			title='Average Number of Jobs Per Class',
-			xaxis=dict(
-				title='Classes',
-				range=[-0.5,numClasses - 0.5],              # set range
-				titlefont=dict(
-				family='Courier New, monospace',
-				size=18,
-				color='#7f7f7f'
-			)
-		),
-			yaxis=dict(
-				title='Number of Jobs',
-				titlefont=dict(
-				family='Courier New, monospace',
-				size=18,
-				color='#7f7f7f'
-			)
-		)
-		)
-		fig1 = go.Figure(data=data1, layout=layout1)
-		unique_url1 = py.plot(fig1, filename = 'SRPT_NumJobsInSysPerClass')
+		path = writeFigure(barFigure(numJobsClass, 'Average Number of Jobs Per Class', numClasses), 'SRPT_NumJobsInSysPerClass')
+		self.writeToConsole("Plot written to %s"%path)
 
 	def calcVariance(self, List, avg):
 		var = 0
@@ -229,18 +234,57 @@ class GUI(Tk):
 		return var/len(List)
 
 	def stopSimulation(self, event):
-		MachineClass.StopSim = True
+		if self.sim is not None:
+			self.sim.StopSim = True
+
+	# Trace every event to the console (debug) or only the summary, also for a run already going
+	def setLogEvents(self, event):
+		if self.sim is not None:
+			self.sim.Trace.level = TRACE_DEBUG if self.frameOut.logEvents.get() else TRACE_SUMMARY
+
+	# Ask for the distribution parameters before the run starts, the worker thread never shows a popup
+	def askDistParams(self, MC, procDist):
+		if procDist == 'Custom':
+			popup = CustomDist(self)
+			self.wait_window(popup.top)
+			MC.customEquation = popup.stringEquation
+		elif procDist == 'Bounded Pareto':
+			popup = BoundedParetoDist(self)
+			self.wait_window(popup.top)
+			MC.BPArray = [float(param) for param in popup.paramArray]
+		MC.timesClicked = 1
+
+	# Run MC.run(*args) on a worker thread, which writes to the console buffer and posts its progress
+	def startRun(self, MC, I, *args):
+		MC.master = MC.Progress = WorkerConsole(self.consoleBuffer)
+		self.setLogEvents(None)
+		self.worker = SimulationThread(MC.run, args)
+		self.worker.start()
+		self.after(REFRESH_INTERVAL, self.pollProgress, MC, I)
+
+	# Show the progress of the run in the status bar until it ends, then its results
+	def pollProgress(self, MC, I):
+		for kind, value in MC.Progress.take():
+			self.updateStatusBar(value.describe() if kind == 'progress' else value)
+		if self.worker.is_alive():
+			self.after(REFRESH_INTERVAL, self.pollProgress, MC, I)
+		elif self.worker.error is not None:
+			print (self.worker.errorText)
+			self.writeToConsole("ERROR: %s"%self.worker.error)
+			self.updateStatusBar("Simulation failed.")
+		else:
+			self.finishRun(MC, I)
 				
 	def submit(self, event):
+		if self.worker is not None and self.worker.is_alive():
+			self.updateStatusBar("A simulation is already running, stop it first.")
+			return
 		self.updateStatusBar("Simulating...")
 		self.clearSavedArrivals()
 		I = Input(self)   
 
-		# Set global variable for num servers to value inputed  
-		global NUM_SERVERS
-		NUM_SERVERS = I.valuesList[0]
-
-		self.printParams(I.valuesList[1],					#load
+		self.printParams(I.valuesList[0],					#num Servers
+						 I.valuesList[1],					#load
 						 'Exponential',						#arrival
 						 I.valuesList[2], I.distList[1], 	#processing rate
 						 I.valuesList[3],					#error min
@@ -248,11 +292,11 @@ class GUI(Tk):
 						 I.valuesList[5], 					#num Classes
 						 I.valuesList[6])					#sim time
 
-		main.timesClicked = 0
-		
-		# Start process
-		MC = MachineClass(self)
-		MC.run(	I.valuesList[1],				#load
+		# Start process on a worker thread, finishRun reports on it once it ends
+		MC = self.sim = MachineClass(self, I.valuesList[0], self.seed, self.rand)
+		self.askDistParams(MC, I.distList[1])
+		self.startRun(MC, I,
+				I.valuesList[1],				#load
 				'Exponential',					#arrival
 				I.valuesList[2], I.distList[1],	# proc
 				I.valuesList[3],				# error min
@@ -260,21 +304,26 @@ class GUI(Tk):
 				I.valuesList[5],				# num class
 				I.valuesList[6])				# sim time
 
+	# Results of a run that has ended, on the main thread
+	def finishRun(self, MC, I):
+		self.printResults(MC)
 
-		self.saveParams(I.valuesList[1],		# load 			
-					'111111111111.1', 			# arrival Rate 			CHANGE LATER
+		self.saveParams(I.valuesList[0],		# num Servers
+					I.valuesList[1],			# load 			
+					None, 						# arrival rate
 					'Exponential',				# arrival dist
-					'111111111111.1',			# proc rate   			CHANGE LATER
+					None,						# proc rate
 					I.distList[1],				# processing dist 	
 					I.valuesList[3], 			# error min
 					I.valuesList[4],			# error max
 					I.valuesList[5], 			# num classes
 					I.valuesList[6],			# sim time
-					JobClass.BPArray[0],		# alpha
-					JobClass.BPArray[1],		# lower
-					JobClass.BPArray[2])		# upper	
+					MC.BPArray[0],				# alpha
+					MC.BPArray[1],				# lower
+					MC.BPArray[2],				# upper	
+					MC.seed, MC.AvgNumJobs, MC.Threshold, MC = MC)
 
-		self.plotNumJobsInSys(I.valuesList[5])
+		self.plotNumJobsInSys(MC.NumJobsSeries, MC.NumJobsClass, I.valuesList[5])
 		self.updateStatusBar("Simulation complete.")
 
 
@@ -469,7 +518,17 @@ class Output(LabelFrame):
 
 		# Stop Button
 		self.stopButton = Button(buttonFrame, text = "STOP SIMULATION", command = self.onStopButtonClick)
-		self.stopButton.grid(row = 2, column = 2)		
+		self.stopButton.grid(row = 2, column = 2)
+
+		# Log Button
+		self.logButton = Button(buttonFrame, text = "LOG TO FILE", command = self.onLogButtonClick)
+		self.logButton.grid(row = 2, column = 3)
+
+		# Log events checkbox, unchecked traces only the summary of a run to the console
+		self.logEvents = BooleanVar()
+		self.logEvents.set(True)
+		self.logEventsCheck = Checkbutton(buttonFrame, text = "LOG EVENTS", variable = self.logEvents, command = self.onLogEventsClick)
+		self.logEventsCheck.grid(row = 2, column = 4)
 
 	def onClearButtonClick(self):
 		# Clear console
@@ -483,6 +542,14 @@ class Output(LabelFrame):
 		# Stop simulation
 		self.stopButton.event_generate("<<stop_sim>>")
 
+	def onLogButtonClick(self):
+		# Log console to a file
+		self.logButton.event_generate("<<output_log>>")
+
+	def onLogEventsClick(self):
+		# Switch per-event console lines
+		self.logEventsCheck.event_generate("<<output_log_events>>")
+
 #----------------------------------------------------------------------#
 # Class: CustomDist
 #
@@ -562,13 +629,13 @@ class CustomDist(object):
 #
 #----------------------------------------------------------------------#
 class BoundedParetoDist(object):
-	Array = []
 	def __init__(self, master):
 		top = self.top = Toplevel(master)
 		top.geometry("500x200")                     # set window size
 		top.resizable(0,0)
 		
 		self.errorMessage = StringVar()
+		self.paramArray = []
 
 		self.alpha = DoubleVar()
 		self.L = DoubleVar()
@@ -613,12 +680,9 @@ class BoundedParetoDist(object):
 		self.b=Button(frame3,text='Ok',command=self.cleanup)
 		self.b.pack()
 
-		
-		self.setupFunction()
 
 	def cleanup(self):
 		if(self.checkParams() == 0):
-			self.paramArray=BoundedParetoDist.Array
 			self.top.destroy()
 
 	def checkParams(self):
@@ -631,237 +695,101 @@ class BoundedParetoDist(object):
 			return 1
 		else:
 			self.errorMessage.set("")
-			BoundedParetoDist.Array = [self.a, self.l, self.u]
+			self.paramArray = [self.a, self.l, self.u]
 			return 0
 
-	def setupFunction(self):
-		x, U, L, alpha = sympy.symbols('x U L alpha')
-		paretoNumerator = -(x*(U**alpha) - x*(L**alpha) - (U**alpha))
-		paretoDenominator = (U**alpha) * (L**alpha)
-		BoundedParetoDist.Function = (paretoNumerator/paretoDenominator)**(-1/alpha)
-
 		
-#----------------------------------------------------------------------#
-# Class: Node
-#
-# This class is used to define the linked list nodes.
-#
-#----------------------------------------------------------------------#
-class Node():
-	def __init__(self, job, nextNode = None):
-		self.job = job
-		self.nextNode = nextNode
-
-#----------------------------------------------------------------------#
-# Class: LinkedList
-#
-# This class is used to make the linked list data structure used to
-# store jobs.
-#
-#----------------------------------------------------------------------#
-class LinkedList(object):
-	#Size = 0
-	NumJobArrayByClass = []
-	#Count = 0
-
-	def __init__(self, head = None):
-		self.head = head
-		LinkedList.NumJobArrayByClass[:] = []
-		LinkedList.Count = 0
-		self.Size = 0
-
-	# Insert job into queue (sorted by class, then name)
-	def insertByClass(self, job):
-		current = self.head		# node iterator, starts at head
-		previous = None
-		if (current == None):	# if queue is empty, set current job as head
-			self.head = Node(job, None)
-		else:
-			while (current != None) and (job.priorityClass >= current.job.priorityClass):# and (job.name > current.job.name):
-				previous = current 				# prev = node[i]
-				current = current.nextNode 		# current = node[i+1]
-			
-			# Insert new node after previous before current
-			if (previous == None):
-				self.head = Node(job, current)
-			else:
-				previous.nextNode = Node(job, current)
-
-		self.Size += 1
-		#print "ENQUEUE JOB"
-
-	#Insert to queue and sort by ERPT
-	def insertByERPT(self, job, numClasses):
-		current = self.head		# node iterator, starts at head
-		previous = None
-		if (current == None):	# if queue is empty, set current job as head
-			self.head = Node(job, None)
-		else:
-			while (current != None) and (job.priorityClass >= current.job.priorityClass) and (job.ERPT > current.job.ERPT):
-				previous = current 				# prev = node[i]
-				current = current.nextNode 		# current = node[i+1]
-			
-			# Insert new node after previous before current
-			if (previous == None):
-				self.head = Node(job, current)
-			else:
-				previous.nextNode = Node(job, current)
-
-		self.Size += 1
-		#print "ENQUEUE JOB"	
-
-	#Insert to queue and sort by LCFS
-	def insertByLCFS(self, job, numClasses):
-		current = self.head		# node iterator, starts at head
-		previous = None
-		if (current == None):	# if queue is empty, set current job as head
-			self.head = Node(job, None)
-		else:
-			while (current != None) and (current.job.priorityClass != numClasses):			# insert at front of last class
-				previous = current 				# prev = node[i]
-				current = current.nextNode 		# current = node[i+1]
-			
-			# Insert new node after previous (before current)
-			if (previous == None):
-				self.head = Node(job, current)
-			else:
-				previous.nextNode = Node(job, current)
-
-		self.Size += 1
-		#print "ENQUEUE JOB"		
-
-	# Remove first item in queue
-	def removeHead(self):
-		if (self.Size > 0):
-			self.head = self.head.nextNode		# move head forward one node
-			self.Size -= 1
-			#print "REMOVING HEAD"
-		else:
-			print ("ERROR: The linked list is already empty!")
-
-	# Return first item in queue
-	def getHead(self):
-		if(self.Size > 0):
-			return self.head
-
-	def clear(self):
-		self.Size = 0
-		self.head = None
-
-	def printList(self, serverID):
-		current = self.head
-		print ("\nJOBS IN QUEUE %s: "%serverID)
-		while (current != None):
-			print ("%s, class %s, ERPT = %.4f"%(current.job.name, current.job.priorityClass, current.job.ERPT))
-			current = current.nextNode
-
-
-	def countClassesQueued(self, numClasses):
-		if(LinkedList.Count == 0):
-			LinkedList.NumJobArrayByClass = [0] * (numClasses + 1)	# create array that holds number of jobs in each classes
-
-		# Iterate through number of classes and count number of jobs per class
-		for j in range(1, numClasses + 1):
-			current = self.head
-			while (current != None):
-				if current.job.priorityClass == j:
-					LinkedList.NumJobArrayByClass[j] += 1
-				elif current.job.priorityClass > numClasses:
-					LinkedList.NumJobArrayByClass[numClasses] += 1
-				current = current.nextNode
-		return LinkedList.NumJobArrayByClass
-
-
 #----------------------------------------------------------------------#
 # Class: JobClass
 #
 # This class is used to define jobs.
 #
-# Attributes: arrival time, processing time, remaining processing 
-# time, estimated remaining processing time, percent error
+# Attributes: id, processing time, remaining processing time,
+# estimated remaining processing time, class. Jobs use
+# __slots__ and keep no reference to the GUI, so the millions made in a
+# run stay small. Rates and samplers are the same for every job in a run
+# and kept on the MachineClass (sim) running it.
 #----------------------------------------------------------------------#
 class JobClass(object):
-	BPArray = []
+	__slots__ = ('id', 'arrivalTime', 'completionTime', 'procTime', 'RPT', 'ERPT', 'priorityClass')
 	
-	def __init__(self, master):
-		self.master = master
+	def __init__(self, jobID):
+		self.id = jobID
+		self.arrivalTime = 0
 		self.completionTime = 0
 		self.procTime = 0
 		self.RPT = 0		# Real Remaining Processing Time
 		self.ERPT = 0		# Estimated Remaining Processing Time
 		self.priorityClass = 100
-		self.percentError = 0
-		self.processRate = 0
-		self.arrivalRate = 0
 
-	def setArrProcRates(self, load, procRate, procDist):
+	@property
+	def name(self):
+		return "Job%02d"%self.id
+
+	# Work out the rates once for each (load, procRate, procDist), BPArray is fixed for a run
+	def setArrProcRates(self, sim, load, procRate, procDist):
+		if sim.RateParams == (load, procRate, procDist):
+			return
+		sim.RateParams = (load, procRate, procDist)
+		processRate = 0
 		if procDist == 'Bounded Pareto':
-			alpha = JobClass.BPArray[0]
-			L = JobClass.BPArray[1]
-			U = JobClass.BPArray[2]
+			alpha = sim.BPArray[0]
+			L = sim.BPArray[1]
+			U = sim.BPArray[2]
 			if alpha > 1 and L > 0:
 				procMean = (L**alpha/(1 - (L/U)**alpha))*(alpha/(alpha - 1))*((1/(L**(alpha - 1)))-(1/(U**(alpha - 1))))
-				self.processRate = 1/float(procMean)
-		else:
-			self.processRate = procRate
-		self.arrivalRate = float(load) * self.processRate
-
-	# Dictionary of service distributions
-	def setServiceDist(self, procRate, procDist):
-		ServiceDistributions =  {
-			'Poisson': random.expovariate(1.0/procRate),
-			'Exponential': random.expovariate(procRate),
-			'Uniform': random.uniform(0.0, procRate),
-			'Bounded Pareto': self.setBoundedPareto,			
-			'Custom': self.setCustomDist
-		}
-		if(procDist == 'Custom'):
-			return ServiceDistributions[procDist](procRate)
-		elif(procDist == 'Bounded Pareto'):
-			return ServiceDistributions[procDist]()
+				processRate = 1/float(procMean)
 		else:
-			return ServiceDistributions[procDist]
-
-	def setCustomDist(self, procRate):
-		if main.timesClicked == 0:
-			main.timesClicked += 1
-			self.popup=CustomDist(self.master)
-			self.master.wait_window(self.popup.top)
-			main.customEquation = self.popup.stringEquation
-		return eval(main.customEquation)
-
-	def setBoundedPareto(self):
+			processRate = procRate
+		sim.processRate = processRate
+		sim.arrivalRate = float(load) * processRate
+
+	# Draw a service time, building the sampler for this run's distribution on first use
+	def setServiceDist(self, sim, procRate, procDist):
+		if sim.ServiceSampler is None:
+			if(procDist == 'Custom'):
+				self.setCustomDist(sim, procRate)
+			elif(procDist == 'Bounded Pareto'):
+				self.setBoundedPareto(sim)
+			sim.ServiceSampler = makeServiceSampler(procDist, procRate, sim.BPArray, sim.customEquation, makeGenerator(sim.rand), sim.rand)
+		return sim.ServiceSampler()
+
+	def setCustomDist(self, sim, procRate):
+		if sim.timesClicked == 0:
+			sim.timesClicked += 1
+			popup = CustomDist(sim.master)
+			sim.master.wait_window(popup.top)
+			sim.customEquation = popup.stringEquation
+
+	def setBoundedPareto(self, sim):
 		# Get and set parameters (in job class array)
-		if main.timesClicked == 0:
-			main.timesClicked += 1
-			self.popup = BoundedParetoDist(self.master)
-			self.master.wait_window(self.popup.top)		
-			self.alpha = float(self.popup.paramArray[0])	# Shape, power of tail, alpha = 2 is approx Expon., alpha = 1 gives higher variance
-			self.L = float(self.popup.paramArray[1])		# Smallest job size
-			self.U = float(self.popup.paramArray[2])		# Largest job size
-			JobClass.BPArray = [self.alpha, self.L, self.U]
-	
-
-		# Sub in to solve
-		main.customEquation = BoundedParetoDist.Function.subs(dict(x=random.uniform(0.0, 1.0), alpha = JobClass.BPArray[0], L = JobClass.BPArray[1], U = JobClass.BPArray[2]))
-		return main.customEquation
+		if sim.timesClicked == 0:
+			sim.timesClicked += 1
+			popup = BoundedParetoDist(sim.master)
+			sim.master.wait_window(popup.top)		
+			alpha = float(popup.paramArray[0])	# Shape, power of tail, alpha = 2 is approx Expon., alpha = 1 gives higher variance
+			L = float(popup.paramArray[1])		# Smallest job size
+			U = float(popup.paramArray[2])		# Largest job size
+			sim.BPArray = [alpha, L, U]
 
 	# Generates a percent error for processing time
-	def generateError(self, percErrorMin, percErrorMax):
-		self.percentError = random.uniform(percErrorMin, percErrorMax)
-		return self.percentError
+	def generateError(self, sim, percErrorMin, percErrorMax):
+		if sim.ErrorParams != (percErrorMin, percErrorMax):
+			sim.ErrorParams = (percErrorMin, percErrorMax)
+			sim.ErrorSampler = makeErrorSampler(percErrorMin, percErrorMax, makeGenerator(sim.rand), sim.rand)
+		return sim.ErrorSampler()
 
 	# Sets all processing times for job
-	def setJobAttributes(self, load, procRate, procDist, percErrorMin, percErrorMax):
+	def setJobAttributes(self, sim, load, procRate, procDist, percErrorMin, percErrorMax):
 		if(procDist == 'Bounded Pareto'):
-			self.procTime = self.setServiceDist(procRate, procDist) 		#use updated proc rate
-			self.setArrProcRates(load, procRate, procDist)
+			self.procTime = self.setServiceDist(sim, procRate, procDist) 		#use updated proc rate
+			self.setArrProcRates(sim, load, procRate, procDist)
 		else:
-			self.setArrProcRates(load, procRate, procDist)
-			self.procTime = self.setServiceDist(procRate, procDist) 		#use updated proc rate
-		self.estimatedProcTime = (1 + (self.generateError(percErrorMin, percErrorMax)/100.0))*self.procTime
+			self.setArrProcRates(sim, load, procRate, procDist)
+			self.procTime = self.setServiceDist(sim, procRate, procDist) 		#use updated proc rate
 		self.RPT = self.procTime
-		self.ERPT = self.estimatedProcTime
+		self.ERPT = (1 + (self.generateError(sim, percErrorMin, percErrorMax)/100.0))*self.procTime	# estimated processing time
+		self.arrivalTime = sim.CurrentTime
 
 #----------------------------------------------------------------------#
 # Class: MachineClass
@@ -872,128 +800,137 @@ class JobClass(object):
 # Events: job arrives, job completes
 # Activities: processing job, waiting for new job
 #
+# All state of a run is kept on the instance, so any number of runs can
+# be made one after another or side by side in one process. Each has its
+# own random stream: rand if given, else a new one seeded with seed.
+#
 #----------------------------------------------------------------------#
 class MachineClass(object):
-	PreviousJobs = []
-	LastClassPrevJobs = []
-	CurrentTime = 0.0
-	TimeUntilArrival = 0.0
-	StopSim = False	
-
-	#print NUM_SERVERS
-	#ServerQueues = [LinkedList() for i in range(NUM_SERVERS)] # List of queue for each server
-	#ServiceStartTimes = [None] * NUM_SERVERS	# Start times of job in each server
-	#ProcessingJobs = [None] * NUM_SERVERS		# Array of current job in each server
-	#ServersBusy = [False] * NUM_SERVERS			# Array of whether each server is busy	
-
-	NextRoutedTo = []
-
-	PrevTime = 0
-	PrevTimeA = 0
-	PrevNumJobs = 0
-	AvgNumJobs = 0
-	PrevNumJobsArray = []
-	NumJobsClass = []
-	counter = 0
-
-
-	def __init__(self, master):
+	def __init__(self, master, numServers, seed = None, rand = None):
 		self.master = master
-		#MachineClass.Queue.clear()
-		MachineClass.PreviousJobs[:] = []
-		MachineClass.LastClassPrevJobs[:] = []
-		MachineClass.CurrentTime = 0.0
-		MachineClass.TimeUntilArrival = 0.0		
-		#MachineClass.ServiceFinishTime = 0
-		#MachineClass.ServerBusy = False
-		MachineClass.StopSim = False
-
-		#for serverID in range(len(MachineClass.ServerQueues)):
-		#	MachineClass.ServerQueues[serverID].clear()
-		#MachineClass.ServerQueues = [LinkedList()] * NUM_SERVERS
-
-		#MachineClass.ServerQueues = [MachineClass.Queue1, MachineClass.Queue2] 	# List of queue for each server
-
-		MachineClass.ServiceStartTimes = [None] * NUM_SERVERS
-		MachineClass.ProcessingJobs = [None] * NUM_SERVERS
-		MachineClass.ServersBusy = [False] * NUM_SERVERS
-
-		MachineClass.NextRoutedTo[:] = []
-
-
-		MachineClass.PrevTime = 0
-		MachineClass.PrevTimeA = 0
-		MachineClass.PrevNumJobs = 0
-		MachineClass.AvgNumJobs = 0		
-		MachineClass.PrevNumJobsArray[:] = []
-		MachineClass.NumJobsClass[:] = []
-		MachineClass.counter = 0
-
-		NumJobs[:] = []
-		NumJobsTime[:] = []
+		self.numServers = numServers
+		self.seed = seed
+		self.rand = rand if rand is not None else random.Random(seed)
+
+		self.CurrentTime = 0.0
+		self.TimeUntilArrival = 0.0
+		self.ArrivalSampler = None
+		self.ArrivalParams = None	# (arrRate, arrDist) the sampler was built for
+		#self.ServiceFinishTime = 0
+		#self.ServerBusy = False
+		self.StopSim = False
+		self.Progress = None		# WorkerConsole posting snapshots to the GUI, when run on a worker thread (see Progress.py)
+		self.Trace = EventTrace(TRACE_FORMATS)	# console trace of the run, debug level unless set (see EventTrace.py)
+		self.WorkFraction = 0.8		# Fraction of the work carried by class 0 jobs
+		self.Threshold = 0			# Largest ERPT in class 0
+
+		# Distribution parameters, asked for in popups on first use unless set before the run
+		self.timesClicked = 0
+		self.customEquation = ""
+		self.BPArray = []
+
+		# Rates and samplers shared by all jobs of the run (see JobClass)
+		self.RateParams = None		# (load, procRate, procDist) the rates were worked out for
+		self.processRate = 0
+		self.arrivalRate = 0
+		self.ServiceSampler = None	# built on first use
+		self.ErrorSampler = None
+		self.ErrorParams = None		# (percErrorMin, percErrorMax) the error sampler was built for
+
+		self.ServerQueues = [ClassQueue() for i in range(numServers)] # List of queue for each server
+		self.ServiceStartTimes = [None] * numServers	# Start times of job in each server
+		self.ProcessingJobs = [None] * numServers		# Array of current job in each server
+		self.ServersBusy = [False] * numServers			# Array of whether each server is busy
+		self.Calendar = ServerCalendar(numServers)		# Completion times of busy servers
+
+		self.NextRoutedTo = []
+
+		self.NumJobsBatches = WarmupBatches()		# batch means of the number of jobs, for its warm-up period and confidence interval
+		self.NumJobsStats = TimeAverage(batches = self.NumJobsBatches)		# number of jobs in the system over time
+		self.ResponseTimes = WarmupBatches()		# batch means of the response times of completed jobs
+		self.Confidence = 0.95
+		self.Warmup = False		# leave the warm-up period found by MSER-5 out of the results
+		self.NumJobsByClass = []		# Number of jobs in the system in each class
+		self.ClassStats = []			# number of jobs in each class over time, updated when it changes
+
+		self.NumJobsSeries = SeriesRecorder(maxPoints = 10000, mode = 'bucket')		# plot series, bounded memory (see TimeSeries.py)
 	
 		self.ctr = 0
 
-		MachineClass.ServerQueues = [LinkedList() for i in range(NUM_SERVERS)] # List of queue for each server
-
-	# Dictionary of arrival distributions
+	# Time-average number of jobs in the system up to the last event, after the warm-up period if it is left out
+	@property
+	def AvgNumJobs(self):
+		if self.Warmup:
+			return self.NumJobsBatches.steady().mean()
+		return self.NumJobsStats.mean()
+
+	# Length of the warm-up period left out of the results, 0 unless run with warmup
+	def warmupTime(self):
+		if self.Warmup:
+			return self.NumJobsBatches.truncation()
+		return 0.0
+
+	# Time-average number of jobs in each class up to the last event, after the warm-up period if it is left out
+	@property
+	def NumJobsClass(self):
+		if self.Warmup:
+			warmup = self.warmupTime()
+			return [stats.batches.rebatch(warmup).mean() for stats in self.ClassStats]
+		time = self.NumJobsStats.lastTime
+		return [stats.mean(time, numJobs) for stats, numJobs in zip(self.ClassStats, self.NumJobsByClass)]
+
+	# Keep a trace record and write its line to the console if anyone reads it, called only once its level is known to be on
+	def trace(self, record):
+		self.Trace.record(record)
+		if self.Trace.output:
+			self.master.writeToConsole(self.Trace.format(record))
+
+	# Results of the run with their confidence intervals, one line each
+	def results(self):
+		lines = ["Simulated Time = %.4f%s"%(self.CurrentTime, " (precision reached)" if self.NumJobsBatches.converged else ""),
+				 "Warm-up Period = %.4f (MSER-5, %s)"%(self.NumJobsBatches.truncation(), "left out" if self.Warmup else "included"),
+				 "Average Number of Jobs = %s"%self.NumJobsBatches.estimate().describe(self.Confidence),
+				 "Average Response Time = %s"%self.ResponseTimes.estimate().describe(self.Confidence)]
+		warmup = self.warmupTime()
+		for priorityClass, stats in enumerate(self.ClassStats):
+			lines.append("Class %s Number of Jobs = %s"%(priorityClass, stats.batches.rebatch(warmup).describe(self.Confidence)))
+		return lines
+
+	# Draw an interarrival time, rebuilding the sampler when the rate or distribution changes
 	def setArrivalDist(self, arrRate, arrDist):
-		ArrivalDistributions = {
-			'Poisson': random.expovariate(1.0/arrRate),
-			'Exponential': random.expovariate(arrRate)
-			#'Normal': Rnd.normalvariate(self.inputInstance.valuesList[0])
-			#'Custom':
-		}
-		return ArrivalDistributions[arrDist]
-
-	#update data
-	def updateJobs(self):
-		for serverID in range(NUM_SERVERS):
-			if(MachineClass.ProcessingJobs[serverID] != None):
-				serviceTime = MachineClass.CurrentTime - MachineClass.ServiceStartTimes[serverID]
-				MachineClass.ProcessingJobs[serverID].RPT -= serviceTime
-				MachineClass.ProcessingJobs[serverID].ERPT -= serviceTime
-				MachineClass.ServiceStartTimes[serverID] = MachineClass.CurrentTime
+		if self.ArrivalParams != (arrRate, arrDist):
+			self.ArrivalParams = (arrRate, arrDist)
+			self.ArrivalSampler = makeArrivalSampler(arrDist, arrRate, makeGenerator(self.rand), self.rand)
+		return self.ArrivalSampler()
+
+	# Update remaining times of the job processing on serverID. A processing job keeps the RPT/ERPT
+	# it started with, so this is only done when it stops or its remaining time is needed.
+	def updateJob(self, serverID):
+		job = self.ProcessingJobs[serverID]
+		serviceTime = self.CurrentTime - self.ServiceStartTimes[serverID]
+		job.RPT -= serviceTime
+		job.ERPT -= serviceTime
+		self.ServiceStartTimes[serverID] = self.CurrentTime
 
 	# Give arriving job a class and add it to the queue
 	def setThreshold(self):
-		import sympy
 		# f(x) is probability density of processing times 
-		# Using Bounded Pareto,
-			# f(x) = {0 if x < 0, main.customEquation if x >= 0}
 		# Probability jobs will be in class 1, ie. their processing time will be between Lower and Threshold
-		# Prob(Lower <= procTime <= Threshold) = integral{from L to T}f(x)dx >> 0.8 (should be very close to 1)
 		# Most jobs will be small, only a few will be big
 
-		# ???
-		# lambda * integral{from L to U} x*f(x) dx < numServers
-
 		#HOW TO FIND THRESHOLD
-		# integral{from L to T} x*f(x)dx / integral{from L to U} x*f(x)dx = 0.8 (becasue 80% of jobs will be small)
-		# solve for T
-		x, L, U, T, alpha = sympy.symbols('x L U T alpha', real=True)
-		
-		numerator = sympy.integrate((x*BoundedParetoDist.Function), (x, L, T))
-		denominator = sympy.integrate((x*BoundedParetoDist.Function), (x, L, U))
-		expected = numerator/denominator
-
-		#expected = expected.subs(dict(alpha=JobClass.BPArray[0], L=JobClass.BPArray[1], U=JobClass.BPArray[2]))
-		expected = expected.subs([(alpha, JobClass.BPArray[0]), (L, JobClass.BPArray[1]), (U, JobClass.BPArray[2])])
-		#print "expected subed"
-		#print expected
-		
-		#Equate expected = 0.8, solve for T
-		#thresholdRange = sympy.solve(sympy.Eq(expected, 0.8), T)
-		#MachineClass.Threshold = thresholdRange[1] #set only positive number
-
-		##FORCE THRESHOLD AS LOGICAL VALUE
-		MachineClass.Threshold = 800000
-		GUI.writeToConsole(self.master, "Class threshold = %s"%MachineClass.Threshold)
-
-		
+		# integral{from L to T} x*f(x)dx / integral{from L to U} x*f(x)dx = WorkFraction
+		# solve for T, numerically from the service distribution
+		try:
+			self.Threshold = workThreshold(self.ServiceSampler, self.WorkFraction)
+		except ValueError:
+			##FORCE THRESHOLD AS LOGICAL VALUE (custom distributions)
+			self.Threshold = 800000
+		if self.Trace.level >= TRACE_SUMMARY:
+			self.trace(('threshold', self.CurrentTime, self.Threshold))
 
 	def assignClass(self, job):
-		if(job.ERPT <= MachineClass.Threshold):
+		if(job.ERPT <= self.Threshold):
 			job.priorityClass = 0
 		else:
 			job.priorityClass = 1
@@ -1002,33 +939,33 @@ class MachineClass(object):
 	# Compare to server last routed to of the same class, send to next one
 	def router(self, job, numClasses):
 		# Set up last routed to once
-		servers = cycle(range(0, NUM_SERVERS))
+		servers = cycle(range(0, self.numServers))
 		if(self.ctr == 0):
-			MachineClass.NextRoutedTo = [0] * numClasses
+			self.NextRoutedTo = [0] * numClasses
 
-			for item in range(len(MachineClass.NextRoutedTo)):
-				MachineClass.NextRoutedTo[item] = next(servers)			# List of last server jobs sent to from each class
+			for item in range(len(self.NextRoutedTo)):
+				self.NextRoutedTo[item] = next(servers)			# List of last server jobs sent to from each class
 																		# Starts with each class routing to a different server
 																		# Class 0 routes to server 0, class 1 routes to server 1...
 			self.sendJobToServer(job, 0, numClasses)					#First job is always Class 0, so update for next arrival																
-			MachineClass.NextRoutedTo[0] += 1
+			self.NextRoutedTo[0] += 1
 			
 			# Return server id job is routed to
 			return 0
 
 		else:
 			# For each priority class, if the incoming job matches the iterator, 
-			for priorityClass in range(len(MachineClass.NextRoutedTo)):
+			for priorityClass in range(len(self.NextRoutedTo)):
 				if (job.priorityClass == priorityClass):
 					#Send job to the next server
-					serverID = MachineClass.NextRoutedTo[priorityClass]
+					serverID = self.NextRoutedTo[priorityClass]
 					self.sendJobToServer(job, serverID, numClasses)
 					
 
-					MachineClass.NextRoutedTo[priorityClass] += 1						# Update where we have routed to so as to go to next server next time.
+					self.NextRoutedTo[priorityClass] += 1						# Update where we have routed to so as to go to next server next time.
 			
-					if(MachineClass.NextRoutedTo[priorityClass] > (NUM_SERVERS-1)):		# Reset after full loop of servers
-						MachineClass.NextRoutedTo[priorityClass] = 0	
+					if(self.NextRoutedTo[priorityClass] > (self.numServers-1)):		# Reset after full loop of servers
+						self.NextRoutedTo[priorityClass] = 0	
 
 					# Return server id job is routed to
 					return serverID
@@ -1038,212 +975,221 @@ class MachineClass(object):
 	##	FOR EACH QUEUE, 
 		# If job is in the last class, sort by LCFS
 		#if (job.priorityClass == (numClasses - 1)):
-		#	MachineClass.ServerQueues[serverID].insertByLCFS(job, numClasses);
-			#GUI.writeToConsole(self.master, "sending job %s, class %s to server %s LCFS"%(job.name, job.priorityClass, serverID))
+		#	self.ServerQueues[serverID].insertByLCFS(job, numClasses);
+			#self.master.writeToConsole("sending job %s, class %s to server %s LCFS"%(job.name, job.priorityClass, serverID))
 
 		#else:
 			# Add current job with new class to queue 
-		MachineClass.ServerQueues[serverID].insertByClass(job)				# add job to queue
-			#GUI.writeToConsole(self.master, "sending job %s, class %s to server %s CLASS"%(job.name, job.priorityClass, serverID))
-
-	def calcNumJobs(self, jobID):
-		self.currentNumJobs = 0
-		for serverID in range(NUM_SERVERS):
-			# Firstly, add all jobs that are waiting in queue
-			self.currentNumJobs += MachineClass.ServerQueues[serverID].Size
-
-			# Secondly, add jobs that are currently processing to the total number in the system
-			if(MachineClass.ServersBusy[serverID] == True):
-				self.currentNumJobs += 1
-		
-		self.t = MachineClass.CurrentTime
-		self.delta_t = self.t - MachineClass.PrevTime 
+		self.ServerQueues[serverID].insertByClass(job)				# add job to queue
+			#self.master.writeToConsole("sending job %s, class %s to server %s CLASS"%(job.name, job.priorityClass, serverID))
 
-		# If one job in system
-		if(jobID == 0):
-			MachineClass.AvgNumJobs = 1 # First event is always create new job
-		# UPDATE 
-		else:
-			MachineClass.AvgNumJobs = (MachineClass.PrevTime/(self.t))*float(MachineClass.AvgNumJobs) + float(MachineClass.PrevNumJobs)*(float(self.delta_t)/self.t)
-			
-		# PrevTime becomes "old" t
-		MachineClass.PrevTime = self.t 
-		# PrevNum jobs becomes current num jobs
-		MachineClass.PrevNumJobs = self.currentNumJobs
-
-		NumJobs.append(MachineClass.AvgNumJobs)				# y axis of plot
-		NumJobsTime.append(MachineClass.CurrentTime)		# x axis of plot
-
-
-	def calcNumJobsPerClass(self, numClasses):
-		totalNumJobs = [0] * numClasses
-		for serverID in range(NUM_SERVERS):
-			#Sum all jobs in each server queue by class
-			currentNumJobs = list(MachineClass.ServerQueues[serverID].countClassesQueued(numClasses)) # Array of jobs by class in total (all servers)
-			#print "current: %s"%currentNumJobs
-			totalNumJobs = [i + j for i, j in zip(totalNumJobs, currentNumJobs)]
-			#print "total: %s"%totalNumJobs 
-
-			#Add jobs that are processing to the total number in the system
-			try:
-				procJob = MachineClass.ProcessingJobs[serverID]	# Get processing job from server i
-				for priorityClass in range(numClasses):			
-					if(priorityClass == procJob.priorityClass):	
-						totalNumJobs[priorityClass] += 1		# Add processing job to the count of the class
-						#print "total: %s"%totalNumJobs 
-			except:
-				pass
-
-		self.t = MachineClass.CurrentTime 
-		self.delta_t = self.t - MachineClass.PrevTimeA
-
-		for i in range(0, numClasses):
-			# If one job in system
-			if(MachineClass.counter == 0):
-				MachineClass.PrevNumJobsArray = [0] * (numClasses) 			# creates array of size (numClasses + 1) filled with 0s
-				MachineClass.NumJobsClass = list(totalNumJobs)			# First event is always create new job
-				MachineClass.counter = 1
-			# UPDATE 
-			else:
-				MachineClass.NumJobsClass[i] = (float(MachineClass.PrevTimeA)/self.t)*float(MachineClass.NumJobsClass[i]) + float(MachineClass.PrevNumJobsArray[i])*(float(self.delta_t)/self.t)
+	def calcNumJobs(self):
+		# Jobs waiting in queue and jobs currently processing, counted by class. Counted
+		# before the event changes them, so this is the number of jobs since the previous event.
+		self.currentNumJobs = sum(self.NumJobsByClass)
+		self.NumJobsStats.add(self.CurrentTime, self.currentNumJobs)
+
+		# The series plots the running average, which needs only one point per bucket
+		if self.NumJobsSeries.startsBucket(self.CurrentTime):
+			self.NumJobsSeries.append(self.CurrentTime, self.NumJobsStats.mean())
+
+	# Add change to the number of jobs in a class, closing off the time it held the old number
+	def countJob(self, priorityClass, change):
+		self.ClassStats[priorityClass].add(self.CurrentTime, self.NumJobsByClass[priorityClass])
+		self.NumJobsByClass[priorityClass] += change
 
-		#print "--%s"%MachineClass.NumJobsClass
-									
-		# PrevTime becomes "old" t (set in regular caclulation)
-		MachineClass.PrevTimeA = self.t 
-		# PrevNum jobs becomes current num jobs
-		MachineClass.PrevNumJobsArray = list(totalNumJobs)
+	# Bring every class up to the last event, so their averages and batches cover the whole run
+	def settleClassStats(self):
+		for priorityClass in range(len(self.ClassStats)):
+			self.countJob(priorityClass, 0)
 
 	def calcNumJobsPerClassPerServer(self):
 		pass
 
 	# Job arriving
 	def arrivalEvent(self, load, arrDist, procRate, procDist, numClasses, percErrorMin, percErrorMax):
-		J = JobClass(self.master)
-		J.setJobAttributes(load, procRate, procDist, percErrorMin, percErrorMax)
-		J.name = "Job%02d"%self.ctr
+		J = JobClass(self.ctr)
+		J.setJobAttributes(self, load, procRate, procDist, percErrorMin, percErrorMax)
 
 		if (self.ctr == 0):
 			self.setThreshold()
 	
-		self.calcNumJobs(self.ctr)
-		self.calcNumJobsPerClass(numClasses)
-
-		self.updateJobs()		# update all processing jobs
+		self.calcNumJobs()
 
 		self.assignClass(J)	# Give job a class, and add to queue
+		self.countJob(J.priorityClass, 1)
 		serverID = self.router(J, numClasses)								# Send job to a server queue
-		procJob = MachineClass.ProcessingJobs[serverID]
+		procJob = self.ProcessingJobs[serverID]
 
-		GUI.writeToConsole(self.master, "%.6f | %s arrived, class = %s, server = %s, erpt=%.6f"%(MachineClass.CurrentTime, J.name, J.priorityClass, serverID, J.ERPT))		
+		if self.Trace.level >= TRACE_EVENT:
+			self.trace(('arrival', self.CurrentTime, J.name, J.priorityClass, serverID, J.ERPT))
 
 		# Preempt processing job at server if new job has higher priority class
 		if (procJob != None):
 			if (J.priorityClass < procJob.priorityClass):
-				GUI.writeToConsole(self.master, "%.6f | %s preempting %s"%(MachineClass.CurrentTime, J.name, procJob.name))
+				if self.Trace.level >= TRACE_DEBUG:
+					self.trace(('preempt', self.CurrentTime, J.name, procJob.name))
 
 				#Remove procJob from processing
-				MachineClass.ServersBusy[serverID] = False
-				MachineClass.ProcessingJobs[serverID] = None
-				MachineClass.ServiceStartTimes[serverID] = None
+				self.updateJob(serverID)
+				self.Calendar.stop(serverID)
+				self.ServersBusy[serverID] = False
+				self.ProcessingJobs[serverID] = None
+				self.ServiceStartTimes[serverID] = None
 
 				# Add preempted job back to queue
 				# If job is in the last class, sort by LCFS
 				if (procJob.priorityClass == (numClasses - 1)):
-					MachineClass.ServerQueues[serverID].insertByLCFS(procJob, numClasses);
-					#GUI.writeToConsole(self.master, "%.6f | %s added back to server %s by lcfs, class = %s"%(MachineClass.CurrentTime, procJob.name, serverID, procJob.priorityClass))
+					self.ServerQueues[serverID].insertByLCFS(procJob, numClasses);
+					#self.master.writeToConsole("%.6f | %s added back to server %s by lcfs, class = %s"%(self.CurrentTime, procJob.name, serverID, procJob.priorityClass))
 
 				else:
 					# Add current job with new class to queue 
-					MachineClass.ServerQueues[serverID].insertByClass(procJob)				# add job to queue
-					#GUI.writeToConsole(self.master, "%.6f | %s added back to server %s  by class, class = %s"%(MachineClass.CurrentTime, procJob.name, serverID, procJob.priorityClass))
+					self.ServerQueues[serverID].insertByClass(procJob)				# add job to queue
+					#self.master.writeToConsole("%.6f | %s added back to server %s  by class, class = %s"%(self.CurrentTime, procJob.name, serverID, procJob.priorityClass))
 				
 		
-		self.processJobs()		# process first job in each queue
+		self.processJobs(serverID)		# process first job in the queue
 
-		MachineClass.TimeUntilArrival = self.setArrivalDist(J.arrivalRate, arrDist)
+		self.TimeUntilArrival = self.setArrivalDist(self.arrivalRate, arrDist)
 		self.ctr += 1
 
-	# Processing first job in queue
-	def processJobs(self):
-		for serverID in range(NUM_SERVERS):
-			#Server i not busy and a job is waiting in the queue
-			if (MachineClass.ServersBusy[serverID] == False) and (MachineClass.ServerQueues[serverID].Size > 0):
-				currentJob = MachineClass.ServerQueues[serverID].getHead().job
+	# Processing first job in queue of server serverID, the only queue that can have changed
+	def processJobs(self, serverID):
+		#Server not busy and a job is waiting in the queue
+		if (self.ServersBusy[serverID] == False) and (self.ServerQueues[serverID].Size > 0):
+			currentJob = self.ServerQueues[serverID].getHead()
 
-				MachineClass.ServiceStartTimes[serverID] = MachineClass.CurrentTime
-				MachineClass.ProcessingJobs[serverID] = currentJob
-				MachineClass.ServersBusy[serverID] = True
-				GUI.writeToConsole(self.master, "%.6f | %s processing on server %s"%(MachineClass.CurrentTime, currentJob.name, serverID))
-				MachineClass.ServerQueues[serverID].removeHead()
+			self.ServiceStartTimes[serverID] = self.CurrentTime
+			self.ProcessingJobs[serverID] = currentJob
+			self.ServersBusy[serverID] = True
+			self.Calendar.start(serverID, self.CurrentTime + currentJob.RPT)
+			if self.Trace.level >= TRACE_DEBUG:
+				self.trace(('start', self.CurrentTime, currentJob.name, serverID))
+			self.ServerQueues[serverID].removeHead()
 
 	# Job completed
-	def completionEvent(self, numClasses, completingJob, load, percErrorMin, percErrorMax):
-		completingJob.completionTime = MachineClass.CurrentTime
+	def completionEvent(self, numClasses, completingJob, serverID, load, percErrorMin, percErrorMax):
+		completingJob.completionTime = self.CurrentTime
+		self.ResponseTimes.add(self.CurrentTime - completingJob.arrivalTime)
 
-		self.calcNumJobs(self.ctr)
-		self.calcNumJobsPerClass(numClasses)
+		self.calcNumJobs()
+		self.countJob(completingJob.priorityClass, -1)
 
 		# Server no longer busy
-		serverID = MachineClass.ProcessingJobs.index(completingJob)
-		MachineClass.ServersBusy[serverID] = False
-		MachineClass.ProcessingJobs[serverID] = None
-		MachineClass.ServiceStartTimes[serverID] = None
-
-		GUI.writeToConsole(self.master, "%.6f | %s COMPLTED at server %s"%(MachineClass.CurrentTime, completingJob.name, serverID))
+		self.updateJob(serverID)
+		self.Calendar.stop(serverID)
+		self.ServersBusy[serverID] = False
+		self.ProcessingJobs[serverID] = None
+		self.ServiceStartTimes[serverID] = None
 
-		#Update other processing jobs (in case next event should be completion)
-		self.updateJobs()
+		if self.Trace.level >= TRACE_EVENT:
+			self.trace(('completion', self.CurrentTime, completingJob.name, serverID))
 
 		#If there is a job waiting for this server, process it
-		if (MachineClass.ServerQueues[serverID].Size > 0):
-			self.processJobs()
+		if (self.ServerQueues[serverID].Size > 0):
+			self.processJobs(serverID)
 
 
-	def run(self, load, arrDist, procRate, procDist, percErrorMin, percErrorMax, numClasses, simLength):
+	def run(self, load, arrDist, procRate, procDist, percErrorMin, percErrorMax, numClasses, simLength, precision = None, confidence = 0.95, warmup = False):
+		self.NumJobsBatches.setPrecision(precision, confidence)	# None runs to simLength
+		self.Confidence = confidence
+		self.Warmup = self.NumJobsBatches.truncate = self.ResponseTimes.truncate = warmup
+		self.NumJobsByClass = [0] * max(numClasses, 2)	# jobs are always small or large
+		self.ClassStats = [TimeAverage(batches = WarmupBatches()) for i in self.NumJobsByClass]
 		while 1:
 			# Generate time of first job arrival
 			if(self.ctr == 0):
 				arrRate = float(load) / procRate
-				MachineClass.TimeUntilArrival = self.setArrivalDist(arrRate, arrDist) # generate next arrival
+				self.TimeUntilArrival = self.setArrivalDist(arrRate, arrDist) # generate next arrival
 
 
-			# Find shortest RPT of all processing jobs		
-			try:
-				minRPT = min(element.RPT for element in MachineClass.ProcessingJobs if element is not None) # gets min rpt value
-				l = [x for x in MachineClass.ProcessingJobs if (x is not None and x.RPT == minRPT)]			# searches for job wiht min rpt value
-				minProcJob = l[0]
-				#GUI.writeToConsole(self.master, "%.4F || Min proc job %s, RPT=%s, ERPT=%s"%(MachineClass.CurrentTime, minProcJob.name, minProcJob.RPT, minProcJob.ERPT))
-			except ValueError:
-				minRPT = -1	
-				minProcJob = None				
+			# Find next completion (job with shortest RPT)
+			nextCompletion = self.Calendar.nextCompletion()
 
 			# If all servers are idle, or next arrival is before completion of shortest job processing next event is ARRIVAL
-			if (all(element == False for element in MachineClass.ServersBusy)) or (MachineClass.TimeUntilArrival < minRPT):
-				MachineClass.CurrentTime += MachineClass.TimeUntilArrival
+			if (nextCompletion is None) or (self.TimeUntilArrival < nextCompletion[0] - self.CurrentTime):
+				self.CurrentTime += self.TimeUntilArrival
 				self.arrivalEvent(load, arrDist, procRate, procDist, numClasses, percErrorMin, percErrorMax)
 
 			#next event is job finishing (job with shortest RPT)			
 			else:
-				completingJob = minProcJob
-				MachineClass.CurrentTime += completingJob.RPT
-				self.completionEvent(numClasses, completingJob, load, percErrorMin, percErrorMax)
-
-			# If current time is greater than the simulation length, end program
-			if (MachineClass.CurrentTime > simLength) or (MachineClass.StopSim == True):
+				completionTime, serverID = nextCompletion
+				completingJob = self.ProcessingJobs[serverID]
+				self.CurrentTime = completionTime
+				self.completionEvent(numClasses, completingJob, serverID, load, percErrorMin, percErrorMax)
+
+			if self.Progress is not None:
+				self.Progress.tick(self)
+
+			# End once past the simulation length, stopped, or the average number of jobs is precise enough
+			if (self.CurrentTime > simLength) or (self.StopSim == True) or self.NumJobsBatches.converged:
+				if self.Trace.level >= TRACE_SUMMARY:
+					self.trace(('end', self.CurrentTime, self.ctr))
 				break
+		self.settleClassStats()
 
 
 
+#----------------------------------------------------------------------#
+# Runs one simulation without the GUI, the same way GUI.submit does.
+# Returns the time-average number of jobs in the system, or the
+# MachineClass that ran if returnMachine is set. Nothing is shared
+# between calls, so runs can be made from several threads at once.
+# The console is traced at traceLevel, by default debug when there is
+# a log file to write it to or records to keep (keepTrace), and off
+# otherwise. Records are only formatted into lines for a log file.
+#----------------------------------------------------------------------#
+def runHeadless(numServers, load, procRate, procDist, percErrorMin, percErrorMax, numClasses, simLength,
+				alpha = 1.1, lower = 1.0, upper = 10**6, customEquation = "", seed = None, logFile = None, saveResults = True, workFraction = 0.8,
+				precision = None, confidence = 0.95, warmup = False, traceLevel = None, keepTrace = 0, returnMachine = False):
+	console = HeadlessConsole(logFile)
+	MC = MachineClass(console, numServers, seed if seed is not None else 994863731)
+
+	# Distribution parameters are given up front, so never show the popups
+	MC.timesClicked = 1
+	MC.customEquation = customEquation
+	MC.BPArray = [alpha, lower, upper]
+	if traceLevel is None:
+		traceLevel = TRACE_DEBUG if logFile or keepTrace else TRACE_OFF
+	MC.Trace = EventTrace(TRACE_FORMATS, traceLevel, keepTrace, output = bool(logFile))
+	MC.WorkFraction = workFraction
+
+	try:
+		MC.run(	load,							# load
+				'Exponential',					# arrival
+				procRate, procDist,				# proc
+				percErrorMin,					# error min
+				percErrorMax,					# error max
+				numClasses,						# num class
+				simLength,						# sim time
+				precision = precision,
+				confidence = confidence,
+				warmup = warmup)
+		GUI.printResults(console, MC)
+	finally:
+		console.close()
+
+	if saveResults:
+		GUI.saveParams(console, numServers, load, None, 'Exponential', None, procDist, percErrorMin, percErrorMax, numClasses, simLength, alpha, lower, upper, MC.seed, MC.AvgNumJobs, MC.Threshold, MC = MC)
+
+	if returnMachine:
+		return MC
+	return MC.AvgNumJobs
+
+
 #----------------------------------------------------------------------#
 def main():
+	# Run without the GUI if asked to on the command line
+	if '--headless' in sys.argv:
+		MC = runHeadless(returnMachine = True, **parseArgs('SRPTE Multi KnownDist', load = 0.90, alpha = 1.1, numClasses = 2, workFraction = 0.8))
+		for line in MC.results():
+			print (line)
+		return
+
 	window = GUI(None)                           			   # instantiate the class with no parent (None)
 	window.title('SRPTE Multi KnownDist')  # title the window
 
-	# Global variables used in JobClass
-	main.timesClicked = 0       
-	main.customEquation = ""
-
 	#window.geometry("500x600")                     # set window size
 	window.mainloop()                               # loop indefinitely, wait for events
 
@@ -0,0 +1,234 @@
+#----------------------------------------------------------------------#
+# Samplers.py
+#
+# Samplers for the arrival and service distributions. A sampler is
+# built once per run for the chosen distribution and is called with no
+# arguments to draw exactly one variate. Samplers given a numpy
+# generator hand out variates from pre-generated blocks, the rest draw
+# one at a time from rand, a random.Random of the simulation (the random
+# module by default), so simulations in one process never share a stream.
+#
+#----------------------------------------------------------------------#
+
+import random
+from math import exp, log, sqrt
+
+import numpy
+
+BLOCK_SIZE = 100000		# variates generated at a time by a BlockSampler
+
+
+# New numpy generator seeded from rand, so seeding rand still fixes the whole run
+def makeGenerator(rand = random):
+	return numpy.random.RandomState(rand.randint(0, 2**32 - 1))
+
+
+#----------------------------------------------------------------------#
+# Class: ExponentialSampler
+#----------------------------------------------------------------------#
+class ExponentialSampler(object):
+	def __init__(self, rate, rand = random):
+		self.rate = rate
+		self.rand = rand
+
+	def __call__(self):
+		return self.rand.expovariate(self.rate)
+
+	def block(self, generator, size):
+		return generator.exponential(1.0/self.rate, size)
+
+	def key(self):
+		return ('Exponential', self.rate)
+
+	# Work below T is 1 - exp(-rate*T)*(1 + rate*T), no closed-form inverse
+	def workThreshold(self, fraction):
+		rate = self.rate
+		return bisectThreshold(lambda T: 1 - exp(-rate*T)*(1 + rate*T), fraction, 0.0, 1.0/rate)
+
+
+#----------------------------------------------------------------------#
+# Class: UniformSampler
+#----------------------------------------------------------------------#
+class UniformSampler(object):
+	def __init__(self, low, high, rand = random):
+		self.low = low
+		self.high = high
+		self.rand = rand
+
+	def __call__(self):
+		return self.rand.uniform(self.low, self.high)
+
+	def block(self, generator, size):
+		return generator.uniform(self.low, self.high, size)
+
+	def key(self):
+		return ('Uniform', self.low, self.high)
+
+	# Work below T is (T**2 - low**2)/(high**2 - low**2)
+	def workThreshold(self, fraction):
+		return sqrt(self.low**2 + fraction*(self.high**2 - self.low**2))
+
+
+#----------------------------------------------------------------------#
+# Class: BoundedParetoSampler
+#
+# Inverse CDF of the Bounded Pareto distribution with shape alpha,
+# smallest job size L and largest job size U. The powers of L and U are
+# worked out once here instead of on every job.
+#
+#----------------------------------------------------------------------#
+class BoundedParetoSampler(object):
+	def __init__(self, alpha, L, U, rand = random):
+		self.alpha = float(alpha)
+		self.L = L
+		self.U = U
+		self.UAlpha = U**self.alpha
+		self.LAlpha = L**self.alpha
+		self.denominator = float(self.UAlpha * self.LAlpha)
+		self.exponent = -1/self.alpha
+		self.rand = rand
+
+	def __call__(self):
+		x = self.rand.uniform(0.0, 1.0)
+		paretoNumerator = float(-(x*self.UAlpha - x*self.LAlpha - self.UAlpha))
+		return (paretoNumerator/self.denominator)**self.exponent
+
+	def block(self, generator, size):
+		x = generator.uniform(0.0, 1.0, size)
+		paretoNumerator = -(x*self.UAlpha - x*self.LAlpha - self.UAlpha)
+		return (paretoNumerator/self.denominator)**self.exponent
+
+	def key(self):
+		return ('Bounded Pareto', self.alpha, self.L, self.U)
+
+	# x*f(x) is proportional to x**-alpha, so the work below T is
+	# (L**(1 - alpha) - T**(1 - alpha))/(L**(1 - alpha) - U**(1 - alpha)),
+	# or log(T/L)/log(U/L) when alpha = 1
+	def workThreshold(self, fraction):
+		if self.alpha == 1:
+			return self.L*(float(self.U)/self.L)**fraction
+		power = 1 - self.alpha
+		LPower = self.L**power
+		return (LPower - fraction*(LPower - self.U**power))**(1/power)
+
+
+#----------------------------------------------------------------------#
+# Class: CustomSampler
+#
+# Inverse CDF typed in the CustomDist popup, in terms of procRate,
+# random and log. The equation is compiled once, and random in it is the
+# simulation's own generator.
+#
+#----------------------------------------------------------------------#
+class CustomSampler(object):
+	def __init__(self, equation, procRate, rand = random):
+		self.equation = equation
+		self.code = compile(equation, '<custom distribution>', 'eval')
+		self.namespace = {'random': rand, 'log': log, 'procRate': procRate}
+
+	def __call__(self):
+		return eval(self.code, self.namespace)
+
+
+#----------------------------------------------------------------------#
+# Work-fraction threshold T of a size distribution, so that jobs of size
+# at most T carry the given fraction of the total work:
+#	integral{from L to T} x*f(x)dx / integral{from L to U} x*f(x)dx = fraction
+# Results are cached by the distribution parameters and fraction.
+#----------------------------------------------------------------------#
+ThresholdCache = {}
+
+def workThreshold(sampler, fraction):
+	if not (0 < fraction < 1):
+		raise ValueError("Work fraction must be between 0 and 1, got %s"%fraction)
+	if isinstance(sampler, BlockSampler):
+		sampler = sampler.sampler
+	if not hasattr(sampler, 'workThreshold'):
+		raise ValueError("No work-fraction threshold for %s"%sampler.__class__.__name__)
+
+	key = sampler.key() + (fraction,)
+	if key not in ThresholdCache:
+		ThresholdCache[key] = sampler.workThreshold(fraction)
+	return ThresholdCache[key]
+
+
+# Solve workBelow(T) = fraction for T by bisection. workBelow must be
+# increasing, high is doubled until it brackets the root.
+def bisectThreshold(workBelow, fraction, low, high, tolerance = 1e-12):
+	while workBelow(high) < fraction:
+		low = high
+		high *= 2
+	while high - low > tolerance * high:
+		mid = (low + high)/2.0
+		if workBelow(mid) < fraction:
+			low = mid
+		else:
+			high = mid
+	return (low + high)/2.0
+
+
+#----------------------------------------------------------------------#
+# Class: BlockSampler
+#
+# This class is used to pre-generate blockSize variates at a time with
+# the vectorized block() of another sampler, then hand them out one per
+# call, so drawing a variate is just a list index.
+#
+#----------------------------------------------------------------------#
+class BlockSampler(object):
+	def __init__(self, sampler, generator, blockSize = BLOCK_SIZE):
+		self.sampler = sampler
+		self.generator = generator
+		self.blockSize = blockSize
+		self.values = []
+		self.index = 0
+
+	def __call__(self):
+		if self.index == len(self.values):
+			self.values = self.sampler.block(self.generator, self.blockSize).tolist()
+			self.index = 0
+		value = self.values[self.index]
+		self.index += 1
+		return value
+
+
+# Wrap a sampler in a BlockSampler if it has a vectorized form and a generator is given
+def blocked(sampler, generator):
+	if generator is None or not hasattr(sampler, 'block'):
+		return sampler
+	return BlockSampler(sampler, generator)
+
+
+#----------------------------------------------------------------------#
+# Build the sampler for a service distribution, as named in the GUI
+#----------------------------------------------------------------------#
+def makeServiceSampler(procDist, procRate, BPArray = None, customEquation = "", generator = None, rand = random):
+	if procDist == 'Poisson':
+		return blocked(ExponentialSampler(1.0/procRate, rand), generator)
+	elif procDist == 'Exponential':
+		return blocked(ExponentialSampler(procRate, rand), generator)
+	elif procDist == 'Uniform':
+		return blocked(UniformSampler(0.0, procRate, rand), generator)
+	elif procDist == 'Bounded Pareto':
+		return blocked(BoundedParetoSampler(BPArray[0], BPArray[1], BPArray[2], rand), generator)
+	elif procDist == 'Custom':
+		return CustomSampler(customEquation, procRate, rand)
+	raise ValueError("Unknown processing distribution: %s"%procDist)
+
+
+#----------------------------------------------------------------------#
+# Build the sampler for an arrival distribution, as named in the GUI
+#----------------------------------------------------------------------#
+def makeArrivalSampler(arrDist, arrRate, generator = None, rand = random):
+	if arrDist == 'Poisson':
+		return blocked(ExponentialSampler(1.0/arrRate, rand), generator)
+	elif arrDist == 'Exponential':
+		return blocked(ExponentialSampler(arrRate, rand), generator)
+	raise ValueError("Unknown arrival distribution: %s"%arrDist)
+
+
+#----------------------------------------------------------------------#
+# Build the sampler for the percent error of the estimated size
+#----------------------------------------------------------------------#
+def makeErrorSampler(percErrorMin, percErrorMax, generator = None, rand = random):
+	return blocked(UniformSampler(percErrorMin, percErrorMax, rand), generator)
@@ -0,0 +1,255 @@
+#----------------------------------------------------------------------#
+# Sweep.py
+#
+# Runs a grid of headless simulations in a pool of worker processes,
+# one grid cell per task, and collects the results in one CSV file.
+# Each cell runs in its own directory under the output directory, so
+# the per-event result files of different cells never mix.
+#
+#	python Sweep.py [GRID.json] [--processes N] [--out DIR] [--db FILE] [--plots FORMAT] [--dry-run]
+#
+# The runs are also added to the results database (see ResultsStore.py)
+# by the parent process, STORE_BATCH at a time.
+#
+# Without a grid file the Cases.txt experiment is run. A grid file is a
+# JSON object with any of the keys of CASES_GRID, each a value or a list
+# of values. Every combination of values is one cell.
+#
+#----------------------------------------------------------------------#
+
+import argparse
+import csv
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+
+# Scripts are imported by the workers, which may have changed directory
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Plots import renderTraces, PLOT_FORMATS
+from ResultsStore import ResultsStore, summarize, RESULTS_DB
+
+# Scripts whose runHeadless takes a number of classes
+CLASS_SCRIPTS = ('ClassBased_Multi_RR', 'ClassBased_Multi_RR_Scaled', 'ClassBased_Multi_RR_Catastrophic', 'SRPTE_Multi_KnownDist')
+
+# Scripts still written for Python 2, which the workers cannot import under Python 3
+PY2_SCRIPTS = ('SRPTE_Multi_LWL',)
+
+# Order the grid is expanded in, the last key changes fastest
+GRID_KEYS = ['script', 'servers', 'load', 'alpha', 'lower', 'upper', 'errors', 'classes', 'simLength', 'procDist', 'procRate', 'seed', 'precision', 'warmup']
+
+# Cases.txt: load 0.8, L = 1, U = 10^6, alpha 1.1/1.5/1.9, sim length 200000,
+# 10 classes, errors of 0, 5, 10 and 20 percent either way. A precision
+# (e.g. 0.01) ends a cell early once its confidence interval is that tight,
+# warmup leaves the warm-up period found by MSER-5 out of the results.
+CASES_GRID = {
+	'script':		['SRPTE_Multi', 'ClassBased_Multi_RR'],
+	'servers':		[2],
+	'load':			[0.8],
+	'alpha':		[1.1, 1.5, 1.9],
+	'lower':		[1.0],
+	'upper':		[10**6],
+	'errors':		[[0, 0], [-5, 5], [-10, 10], [-20, 20]],
+	'classes':		[10],
+	'simLength':	[200000.0],
+	'procDist':		['Bounded Pareto'],
+	'procRate':		[0.5],
+	'seed':			[1],
+	'precision':	[None],
+	'warmup':		[False],
+}
+
+STORE_BATCH = 100		# rows added to the results database per transaction
+
+RESULT_COLUMNS = ['cell', 'script', 'servers', 'load', 'alpha', 'lower', 'upper', 'percErrorMin', 'percErrorMax',
+				  'classes', 'simLength', 'procDist', 'procRate', 'seed', 'precision', 'warmup', 'avgNumJobs', 'numJobsHalfWidth', 'numJobsVar', 'numJobsMin',
+				  'numJobsMax', 'numJobsClass', 'responseTime', 'responseTimeHalfWidth', 'simTime', 'warmupTime', 'seconds', 'error']
+
+
+#----------------------------------------------------------------------#
+# Expand a grid into a list of cells, one dict of parameters per run.
+# Scripts without classes get classes = None, and are run once rather
+# than once per number of classes.
+#----------------------------------------------------------------------#
+def expandGrid(grid):
+	unknown = set(grid) - set(GRID_KEYS)
+	if unknown:
+		raise ValueError("Unknown grid keys: %s"%", ".join(sorted(unknown)))
+
+	axes = []
+	for key in GRID_KEYS:
+		values = grid.get(key, CASES_GRID[key])
+		# A single value, or a single error range, stands for a one-value axis
+		if not isinstance(values, list) or (key == 'errors' and not isinstance(values[0], list)):
+			values = [values]
+		axes.append(values)
+
+	cells = []
+	seen = set()
+	for values in itertools.product(*axes):
+		cell = dict(zip(GRID_KEYS, values))
+		cell['script'] = str(cell['script'])
+		if cell['script'] in PY2_SCRIPTS and sys.version_info[0] >= 3:
+			raise ValueError("%s is a Python 2 script and cannot be imported by a Python 3 sweep, leave it out of the grid"%cell['script'])
+		cell['percErrorMin'], cell['percErrorMax'] = cell.pop('errors')
+		if cell['script'] not in CLASS_SCRIPTS:
+			cell['classes'] = None
+
+		key = tuple(sorted(cell.items()))
+		if key not in seen:
+			seen.add(key)
+			cell['cell'] = len(cells)
+			cells.append(cell)
+	return cells
+
+
+#----------------------------------------------------------------------#
+# Worker: run one cell in its own directory and return its result row.
+# Errors are returned in the row instead of stopping the sweep.
+#----------------------------------------------------------------------#
+def runCell(task):
+	cell, outDir, traceFormat = task
+	row = dict(cell)
+	start = time.time()
+	cellDir = os.path.join(outDir, "cell_%05d"%cell['cell'])
+	try:
+		if not os.path.isdir(cellDir):
+			os.makedirs(cellDir)
+		os.chdir(cellDir)
+		module = importlib.import_module(cell['script'])
+
+		kwargs = dict(numServers = cell['servers'], load = cell['load'], procRate = cell['procRate'], procDist = cell['procDist'],
+					  percErrorMin = cell['percErrorMin'], percErrorMax = cell['percErrorMax'], simLength = cell['simLength'],
+					  alpha = cell['alpha'], lower = cell['lower'], upper = cell['upper'], seed = cell['seed'], saveResults = False)
+		if cell['classes'] is not None:
+			kwargs['numClasses'] = cell['classes']
+		if cell['precision'] is not None:
+			kwargs['precision'] = cell['precision']
+		if cell['warmup']:
+			kwargs['warmup'] = True
+		code = module.runHeadless.__code__
+		if 'traceFormat' in code.co_varnames[:code.co_argcount]:
+			kwargs['traceFormat'] = traceFormat
+
+		machine = module.runHeadless(returnMachine = True, **kwargs)
+		summary = summarize(machine)
+		row['classMetrics'] = summary.pop('classes')
+		row.update(summary)
+		if cell['classes'] is not None and row['classMetrics']:
+			row['numJobsClass'] = " ".join("%f"%n for n, halfWidth in row['classMetrics'])
+	except Exception:
+		row['error'] = traceback.format_exc().strip().splitlines()[-1]
+	finally:
+		os.chdir(outDir)
+	row['seconds'] = round(time.time() - start, 3)
+	return row
+
+
+# A result row as a record of the results database
+def storeRecord(row):
+	record = dict((key, row[key]) for key in ('servers', 'load', 'alpha', 'lower', 'upper', 'percErrorMin', 'percErrorMax', 'simLength',
+											  'procDist', 'procRate', 'seed', 'precision', 'warmup', 'avgNumJobs', 'numJobsHalfWidth', 'numJobsVar',
+											  'numJobsMin', 'numJobsMax', 'responseTime', 'responseTimeHalfWidth', 'simTime', 'warmupTime', 'seconds'))
+	record.update(variant = row['script'], arrDist = 'Exponential', numClasses = row['classes'], confidence = 0.95, classes = row['classMetrics'])
+	return record
+
+
+#----------------------------------------------------------------------#
+# Run all cells on a pool of processes, writing each row to the results
+# file as it comes in, and the rows of runs that did not fail to store,
+# a ResultsStore, in batches. Returns the rows in cell order.
+#----------------------------------------------------------------------#
+def runSweep(cells, outDir, processes = None, traceFormat = 'binary', resultsName = 'sweep_results.csv', store = None):
+	outDir = os.path.abspath(outDir)
+	if not os.path.isdir(outDir):
+		os.makedirs(outDir)
+	processes = processes or multiprocessing.cpu_count()
+
+	rows = []
+	batch = []
+	tasks = [(cell, outDir, traceFormat) for cell in cells]
+	with open(os.path.join(outDir, resultsName), 'w') as resultsFile:
+		writer = csv.DictWriter(resultsFile, RESULT_COLUMNS, lineterminator = '\n', extrasaction = 'ignore')
+		writer.writeheader()
+
+		pool = multiprocessing.Pool(processes)
+		try:
+			for row in pool.imap_unordered(runCell, tasks):
+				writer.writerow(row)
+				resultsFile.flush()
+				rows.append(row)
+				print ("[%d/%d] cell %d %s: %s (%.1fs)"%(len(rows), len(cells), row['cell'], row['script'],
+							row.get('error') or "avg number of jobs = %f"%row['avgNumJobs'], row['seconds']))
+				if store is not None and not row.get('error'):
+					batch.append(storeRecord(row))
+					if len(batch) >= STORE_BATCH:
+						stored, batch = batch, []		# a batch that fails to store is not written again below
+						store.addRuns(stored)
+			pool.close()
+		except KeyboardInterrupt:
+			pool.terminate()
+			pool.join()
+			if batch:		# what has finished is kept, even if the sweep is interrupted
+				store.addRuns(batch)
+			raise
+		except BaseException:		# stop the workers on any error, or join() would wait on a pool still running
+			pool.terminate()
+			pool.join()
+			raise
+		pool.join()
+		if batch:
+			store.addRuns(batch)
+
+	rows.sort(key = lambda row: row['cell'])
+	return rows
+
+
+#----------------------------------------------------------------------#
+def main():
+	parser = argparse.ArgumentParser(description = 'Run a grid of headless simulations on all cores')
+	parser.add_argument('grid', nargs = '?', default = None, help = 'JSON grid file (default: the Cases.txt experiment)')
+	parser.add_argument('--processes', type = int, default = None, help = 'worker processes (default: one per core)')
+	parser.add_argument('--out', dest = 'outDir', default = 'SWEEP_RESULTS', help = 'output directory')
+	parser.add_argument('--trace-format', dest = 'traceFormat', default = 'binary', choices = ['text', 'binary'],
+						help = 'format of the per-cell number of jobs over time, for scripts that write it')
+	parser.add_argument('--db', default = RESULTS_DB, help = 'results database to add the runs to (default: %s)'%RESULTS_DB)
+	parser.add_argument('--plots', default = None, choices = PLOT_FORMATS,
+						help = 'also plot every cell\'s binary trace to OUT/plots in this format, on the same pool size')
+	parser.add_argument('--dry-run', dest = 'dryRun', action = 'store_true', help = 'list the cells without running them')
+	args = parser.parse_args()
+
+	grid = CASES_GRID
+	if args.grid is not None:
+		with open(args.grid) as gridFile:
+			grid = json.load(gridFile)
+	cells = expandGrid(grid)
+
+	if args.dryRun:
+		for cell in cells:
+			print (", ".join("%s=%s"%(key, cell[key]) for key in RESULT_COLUMNS if key in cell))
+		print ("%d cells"%len(cells))
+		return
+
+	start = time.time()
+	store = ResultsStore(args.db)
+	try:
+		rows = runSweep(cells, args.outDir, args.processes, args.traceFormat, store = store)
+	finally:
+		store.close()
+	failed = len([row for row in rows if row.get('error')])
+	print ("%d cells, %d failed, in %.1fs. Results in %s and %s"%(len(rows), failed, time.time() - start, os.path.join(args.outDir, 'sweep_results.csv'), args.db))
+
+	if args.plots:
+		start = time.time()
+		plotDir = os.path.join(args.outDir, 'plots')
+		results = renderTraces(args.outDir, plotDir, args.plots, args.processes)
+		failed = len([error for directory, paths, error in results if error])
+		print ("%d traces plotted, %d failed, in %.1fs. Plots in %s"%(len(results), failed, time.time() - start, plotDir))
+
+
+if __name__ == '__main__': main()
@@ -0,0 +1,218 @@
+#----------------------------------------------------------------------#
+# TimeSeries.py
+#
+# Bounded-memory recorder for the number of jobs over time, used for
+# the plots instead of keeping every event in a list, and a streaming
+# time-weighted average of it.
+#
+#----------------------------------------------------------------------#
+
+import random
+
+
+#----------------------------------------------------------------------#
+# Class: SeriesRecorder
+#
+# This class is used to record a (time, value) series in constant
+# memory, however long the run is. Two modes:
+#	'bucket'	- time is split into at most maxPoints/2 equal buckets
+#				  keeping the min, max and mean of each. When a new event
+#				  falls past the last bucket, neighbouring buckets are
+#				  merged and the width doubles. points() gives the min
+#				  and max of each bucket in time order, so spikes still
+#				  show up in the plot.
+#	'reservoir'	- a uniform random sample of maxPoints events. Uses its
+#				  own random generator so the simulation's stream is not
+#				  touched.
+#
+#----------------------------------------------------------------------#
+class SeriesRecorder(object):
+	def __init__(self, maxPoints = 10000, mode = 'bucket', width = 1.0, seed = 0):
+		if mode not in ('bucket', 'reservoir'):
+			raise ValueError("Unknown series mode: %s"%mode)
+		self.maxPoints = max(2, int(maxPoints))
+		self.mode = mode
+		self.initialWidth = float(width)
+		self.seed = seed
+		self.clear()
+
+	def clear(self):
+		self.count = 0							# events seen, not events kept
+		self.width = self.initialWidth
+		self.buckets = []						# [minTime, minValue, maxTime, maxValue, sum, count] or None
+		self.reservoir = []						# (time, value)
+		self.nextBucketTime = 0.0				# start of the bucket after the last point's
+		self.rand = random.Random(self.seed)
+
+	def __len__(self):
+		return self.count
+
+	def append(self, time, value):
+		self.count += 1
+		if self.mode == 'reservoir':
+			if len(self.reservoir) < self.maxPoints:
+				self.reservoir.append((time, value))
+			else:
+				i = self.rand.randrange(self.count)
+				if i < self.maxPoints:
+					self.reservoir[i] = (time, value)
+			return
+
+		index = int(time / self.width)
+		while index >= self.maxPoints // 2:
+			self.mergeBuckets()
+			index = int(time / self.width)
+		while len(self.buckets) <= index:
+			self.buckets.append(None)
+		self.nextBucketTime = (index + 1) * self.width
+
+		bucket = self.buckets[index]
+		if bucket is None:
+			self.buckets[index] = [time, value, time, value, value, 1]
+		else:
+			if value < bucket[1]:
+				bucket[0] = time
+				bucket[1] = value
+			if value >= bucket[3]:
+				bucket[2] = time
+				bucket[3] = value
+			bucket[4] += value
+			bucket[5] += 1
+
+	# Whether a point at time would be past the last point's bucket (always, in reservoir mode). A series that hardly
+	# changes from one event to the next, such as a running average, needs only one point per bucket, so its value
+	# need only be worked out when this is true.
+	def startsBucket(self, time):
+		return time >= self.nextBucketTime
+
+	# Halve the number of buckets by merging neighbours
+	def mergeBuckets(self):
+		merged = []
+		for i in range(0, len(self.buckets), 2):
+			first = self.buckets[i]
+			second = self.buckets[i + 1] if i + 1 < len(self.buckets) else None
+			if first is None or second is None:
+				merged.append(first if second is None else second)
+				continue
+			low = first if first[1] <= second[1] else second
+			high = second if second[3] >= first[3] else first
+			merged.append([low[0], low[1], high[2], high[3], first[4] + second[4], first[5] + second[5]])
+		self.buckets = merged
+		self.width *= 2
+
+	# Points to plot, as (times, values) lists in time order
+	def points(self):
+		times = []
+		values = []
+		if self.mode == 'reservoir':
+			for time, value in sorted(self.reservoir):
+				times.append(time)
+				values.append(value)
+			return times, values
+
+		for bucket in self.buckets:
+			if bucket is None:
+				continue
+			minPoint = (bucket[0], bucket[1])
+			maxPoint = (bucket[2], bucket[3])
+			for time, value in sorted(set([minPoint, maxPoint])):
+				times.append(time)
+				values.append(value)
+		return times, values
+
+	# Mean of each bucket at the bucket's midpoint, as (times, means) lists
+	def means(self):
+		times = []
+		means = []
+		if self.mode == 'reservoir':
+			return self.points()
+
+		for i, bucket in enumerate(self.buckets):
+			if bucket is not None:
+				times.append((i + 0.5) * self.width)
+				means.append(float(bucket[4]) / bucket[5])
+		return times, means
+
+
+#----------------------------------------------------------------------#
+# Class: TimeAverage
+#
+# This class is used to keep the time-weighted mean, variance, min and
+# max of a piecewise-constant value such as the number of jobs, in
+# constant time per update. add(time, value) is given the value held
+# since the previous update. The integrals of value and value**2 over
+# time are kept with compensated (Kahan-Neumaier) summation, so the
+# mean stays accurate over very long runs. Nothing is divided until
+# the mean is asked for. Given a BatchMeans, every interval is also
+# added to it, for a confidence interval of the mean.
+#
+#----------------------------------------------------------------------#
+class TimeAverage(object):
+	def __init__(self, startTime = 0.0, batches = None):
+		self.batches = batches
+		self.clear(startTime)
+
+	def clear(self, startTime = 0.0):
+		self.startTime = startTime
+		self.lastTime = startTime
+		self.area = 0.0				# integral of value dt
+		self.areaError = 0.0		# compensation for the rounding lost from area
+		self.squares = 0.0			# integral of value**2 dt
+		self.squaresError = 0.0
+		self.min = None				# over intervals of non-zero length
+		self.max = None
+
+	# value was held from the previous update up to time
+	def add(self, time, value):
+		dt = time - self.lastTime
+		self.lastTime = time
+		if dt <= 0:
+			return
+
+		x = value * dt
+		total = self.area + x
+		if abs(self.area) >= abs(x):
+			self.areaError += (self.area - total) + x
+		else:
+			self.areaError += (x - total) + self.area
+		self.area = total
+
+		x *= value
+		total = self.squares + x
+		if abs(self.squares) >= abs(x):
+			self.squaresError += (self.squares - total) + x
+		else:
+			self.squaresError += (x - total) + self.squares
+		self.squares = total
+
+		if self.min is None or value < self.min:
+			self.min = value
+		if self.max is None or value > self.max:
+			self.max = value
+
+		if self.batches is not None:
+			self.batches.add(value, dt)
+
+	# Time elapsed up to time (default the last update)
+	def elapsed(self, time = None):
+		if time is None:
+			time = self.lastTime
+		return time - self.startTime
+
+	# Mean up to time (default the last update), with value held since the last update
+	def mean(self, time = None, value = 0):
+		elapsed = self.elapsed(time)
+		if elapsed <= 0:
+			return 0.0
+		area = self.area + self.areaError
+		if time is not None:
+			area += value * (time - self.lastTime)
+		return area / elapsed
+
+	# Time-weighted variance up to the last update
+	def variance(self):
+		elapsed = self.elapsed()
+		if elapsed <= 0:
+			return 0.0
+		mean = (self.area + self.areaError) / elapsed
+		return max(0.0, (self.squares + self.squaresError) / elapsed - mean * mean)